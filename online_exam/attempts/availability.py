@@ -0,0 +1,58 @@
+# attempts/availability.py
+"""
+"Available exams for a student": published, started, and not attempted yet.
+
+The query is an anti-join (NOT EXISTS on the student's attempt) backed by
+the (published, start_at) index on Exam and the unique (student, exam)
+index on Attempt. Results are cached per student for a few seconds since
+both the exam list and the student dashboard ask for them on every visit.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    DateTimeField, DurationField, Exists, ExpressionWrapper, F, IntegerField, OuterRef,
+)
+from django.utils import timezone
+
+from .models import Attempt
+from questions.models import Exam
+
+DEFAULT_CACHE_TTL = 30
+
+
+def _cache_key(user_id, open_only):
+    return f'available_exams:{user_id}:{int(open_only)}'
+
+
+def available_exams_query(user, now=None, open_only=False):
+    """
+    Build the queryset of exams the student can still start.
+    With open_only, exams whose time window (start_at + duration) has ended are left out.
+    """
+    now = now or timezone.now()
+    taken = Attempt.objects.filter(student=user, exam=OuterRef('pk'))
+    exams = Exam.objects.filter(published=True, start_at__lte=now).filter(~Exists(taken))
+    if open_only:
+        # Explicit output fields keep this duration arithmetic working on SQLite
+        minutes = ExpressionWrapper(F('duration_minutes'), output_field=IntegerField())
+        duration = ExpressionWrapper(timedelta(minutes=1) * minutes, output_field=DurationField())
+        exams = exams.alias(
+            ends_at=ExpressionWrapper(F('start_at') + duration, output_field=DateTimeField())
+        ).filter(ends_at__gt=now)
+    return exams
+
+
+def get_available_exams(user, open_only=False):
+    """Return the available exams of a student as a list, cached for a short time"""
+    key = _cache_key(user.pk, open_only)
+    exams = cache.get(key)
+    if exams is None:
+        exams = list(available_exams_query(user, open_only=open_only))
+        cache.set(key, exams, getattr(settings, 'AVAILABLE_EXAMS_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return exams
+
+
+def invalidate_available_exams(user_id):
+    cache.delete_many([_cache_key(user_id, False), _cache_key(user_id, True)])
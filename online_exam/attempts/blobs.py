@@ -0,0 +1,114 @@
+# attempts/blobs.py
+"""
+Reference counts and garbage collection of answer file blobs.
+
+FileBlob.refcount is the number of answers whose uploaded_file points at a
+blob. It is kept up to date by the Answer signals in the same transaction as
+the answer itself. A blob is written to disk before the answer referring to
+it is saved, so a blob without references is only collected after a grace
+period, and only when it has not been reused (its mtime) in that time.
+"""
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Answer, FileBlob
+from .storage import BLOB_DIR, answer_storage, blob_relative_path, blob_sha256
+
+DEFAULT_GRACE = timedelta(days=1)
+
+
+def _recount(sha256):
+    storage = answer_storage()
+    count = Answer.objects.filter(uploaded_file__startswith=f'{blob_relative_path(sha256)}/').count()
+    path = storage.blob_path(sha256)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    FileBlob.objects.bulk_create(
+        [FileBlob(sha256=sha256, size=size, refcount=count, released_at=None if count else timezone.now())],
+        update_conflicts=True, unique_fields=['sha256'], update_fields=['size', 'refcount', 'released_at']
+    )
+
+
+def retain_blob(name):
+    sha256 = blob_sha256(name)
+    if sha256 and not FileBlob.objects.filter(pk=sha256).update(refcount=F('refcount') + 1, released_at=None):
+        # First answer using this blob (or a lost row): count from the answers
+        _recount(sha256)
+
+
+def release_blob(name):
+    sha256 = blob_sha256(name)
+    if not sha256:
+        return
+    if not FileBlob.objects.filter(pk=sha256).update(refcount=F('refcount') - 1):
+        _recount(sha256)
+    FileBlob.objects.filter(pk=sha256, refcount__lte=0, released_at__isnull=True).update(released_at=timezone.now())
+
+
+def recount_blobs():
+    """Recompute every reference count from the answers; returns the number of blobs"""
+    counts = Counter()
+    names = Answer.objects.filter(uploaded_file__startswith=f'{BLOB_DIR}/').values_list('uploaded_file', flat=True)
+    for name in names.iterator(chunk_size=2000):
+        counts[blob_sha256(name)] += 1
+    counts.pop(None, None)
+
+    with transaction.atomic():
+        FileBlob.objects.update(refcount=0)
+        for sha256, count in counts.items():
+            if not FileBlob.objects.filter(pk=sha256).update(refcount=count, released_at=None):
+                _recount(sha256)
+        FileBlob.objects.filter(refcount=0, released_at__isnull=True).update(released_at=timezone.now())
+    return len(counts)
+
+
+def _stale(path, cutoff):
+    try:
+        return os.path.getmtime(path) < cutoff.timestamp()
+    except FileNotFoundError:
+        return True
+
+
+def collect_blobs(grace=DEFAULT_GRACE):
+    """
+    Delete blobs that no answer has referred to for longer than `grace`, and
+    blob files that never got a FileBlob row (their answer was not saved).
+    Returns (deleted blobs, freed bytes).
+    """
+    storage = answer_storage()
+    cutoff = timezone.now() - grace
+    deleted = freed = 0
+
+    released = FileBlob.objects.filter(refcount__lte=0, released_at__lt=cutoff)
+    for sha256, size in list(released.values_list('sha256', 'size')):
+        path = storage.blob_path(sha256)
+        if not _stale(path, cutoff):
+            continue
+        if FileBlob.objects.filter(pk=sha256, refcount__lte=0).delete()[0]:
+            if os.path.exists(path):
+                os.remove(path)
+            deleted += 1
+            freed += size
+
+    root = storage.blob_root()
+    if not os.path.isdir(root):
+        return deleted, freed
+    for directory in os.scandir(root):
+        if directory.is_file():
+            # Left behind by a save that died half way
+            if directory.name.endswith('.tmp') and _stale(directory.path, cutoff):
+                os.remove(directory.path)
+            continue
+        entries = {entry.name: entry for entry in os.scandir(directory.path) if entry.is_file()}
+        known = set(FileBlob.objects.filter(pk__in=list(entries)).values_list('pk', flat=True))
+        for name, entry in entries.items():
+            if name not in known and _stale(entry.path, cutoff):
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                deleted += 1
+                freed += size
+    return deleted, freed
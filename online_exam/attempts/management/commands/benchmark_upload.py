@@ -0,0 +1,99 @@
+# attempts/management/commands/benchmark_upload.py
+import gc
+import hashlib
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attempts.models import Attempt, Answer
+from questions.models import Exam, Question
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Uploads synthetic file answers in chunks and reports time and peak memory (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,200',
+                            help='Comma separated file sizes in MB')
+        parser.add_argument('--chunk-size', type=int, default=1024 * 1024,
+                            help='Chunk size in bytes')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        chunk_size = options['chunk_size']
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                ANSWER_UPLOAD_CHUNK_SIZE=chunk_size,
+                ANSWER_UPLOAD_MAX_SIZE=max(sizes) * 1024 * 1024,
+                ALLOWED_HOSTS=['testserver'],
+                DEBUG=False  # the query log would grow with the number of chunks
+            ), transaction.atomic():
+                teacher = User.objects.create_user('benchmark-upload-teacher', role='teacher')
+                student = User.objects.create_user('benchmark-upload-student', role='student')
+                exam = Exam.objects.create(
+                    title='benchmark', teacher=teacher, start_at=timezone.now() - timedelta(minutes=1),
+                    duration_minutes=600, published=True
+                )
+                client = Client()
+                client.force_login(student)
+
+                self.stdout.write(f'{"size":>8} {"seconds":>8} {"MB/s":>8} {"peak memory":>12}')
+                for size_mb in sizes:
+                    question = Question.objects.create(exam=exam, text='file', qtype=Question.TYPE_FILE, max_score=1)
+                    attempt, _ = Attempt.objects.get_or_create(student=student, exam=exam)
+                    Answer.objects.create(attempt=attempt, question=question)
+                    self.run_upload(client, attempt, question, size_mb * 1024 * 1024, chunk_size)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def run_upload(self, client, attempt, question, size, chunk_size):
+        # One chunk of data is sent over and over, so the client holds no more than a chunk
+        chunk = bytes(range(256)) * (chunk_size // 256)
+        digest = hashlib.sha256()
+        for offset in range(0, size, len(chunk)):
+            digest.update(chunk[:size - offset])
+
+        tracemalloc.start()
+        started = time.monotonic()
+        state = client.post(
+            reverse('attempts:start_upload', args=[attempt.pk]),
+            {'question': question.pk, 'filename': 'scan.pdf', 'size': size, 'sha256': digest.hexdigest()},
+            content_type='application/json'
+        ).json()
+        while not state['complete']:
+            response = client.put(
+                state['url'], chunk[:size - state['offset']],
+                content_type='application/octet-stream',
+                headers={'Upload-Offset': str(state['offset'])}
+            )
+            state = response.json()
+            if response.status_code != 200:
+                raise RuntimeError(state['error'])
+            # The test client's request/response cycles keep the sent chunk alive until collected
+            del response
+            gc.collect()
+        elapsed = time.monotonic() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'{size // (1024 * 1024):>6}MB {elapsed:>8.2f} {size / elapsed / (1024 * 1024):>8.1f} {peak / (1024 * 1024):>10.1f}MB'
+        )
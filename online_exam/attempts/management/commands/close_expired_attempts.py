@@ -0,0 +1,40 @@
+# attempts/management/commands/close_expired_attempts.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from attempts.sweeper import DEFAULT_BATCH_SIZE, close_expired_attempts
+from questions.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Submits in-progress attempts whose time is over'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of attempts closed per UPDATE batch')
+        parser.add_argument('--grade', action='store_true',
+                            help='Queue the affected exams for background auto-grading')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping instead of exiting')
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='Seconds to sleep between sweeps in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            closed, exam_ids = close_expired_attempts(batch_size=options['batch_size'])
+            if closed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Closed {closed} expired attempts of {len(exam_ids)} exams'
+                ))
+                if options['grade']:
+                    from grading.jobs import enqueue_exam_grading
+                    for exam in Exam.objects.filter(pk__in=exam_ids):
+                        job = enqueue_exam_grading(exam)
+                        self.stdout.write(f'  Queued grading job {job.pk} for "{exam.title}"')
+            elif not options['loop']:
+                self.stdout.write('No expired attempts')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+# attempts/management/commands/collect_file_blobs.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from attempts.blobs import collect_blobs, recount_blobs
+
+
+class Command(BaseCommand):
+    help = 'Deletes answer file blobs that no answer refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced blobs for this long before deleting them')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute the reference counts from the answers first')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            blobs = recount_blobs()
+            self.stdout.write(f'Recounted references of {blobs} blobs')
+        deleted, freed = collect_blobs(timedelta(hours=options['grace_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} blobs, freed {freed / (1024 * 1024):.1f} MB'))
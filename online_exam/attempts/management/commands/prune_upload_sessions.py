@@ -0,0 +1,18 @@
+# attempts/management/commands/prune_upload_sessions.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from attempts.uploads import prune_upload_sessions
+
+
+class Command(BaseCommand):
+    help = 'Deletes abandoned chunked upload sessions and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Delete sessions idle for longer than this')
+
+    def handle(self, *args, **options):
+        deleted = prune_upload_sessions(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} upload sessions idle for over {options["hours"]} hours'))
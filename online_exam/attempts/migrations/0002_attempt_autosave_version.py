@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='autosave_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:58
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    Attempt = apps.get_model('attempts', 'Attempt')
+    batch = []
+    for attempt in Attempt.objects.filter(deadline__isnull=True).select_related('exam').iterator(chunk_size=1000):
+        attempt.deadline = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+        batch.append(attempt)
+        if len(batch) >= 1000:
+            Attempt.objects.bulk_update(batch, ['deadline'])
+            batch = []
+    Attempt.objects.bulk_update(batch, ['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0002_attempt_autosave_version'),
+        ('questions', '0002_exam_published_start_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['status', 'deadline'], name='attempts_at_status_e0791e_idx'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
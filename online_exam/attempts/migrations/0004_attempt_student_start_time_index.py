@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0003_attempt_deadline'),
+        ('questions', '0003_exam_teacher_start_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['student', '-start_time'], name='attempts_at_student_a38d4d_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:32
+
+import attempts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0005_upload_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='uploaded_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=attempts.storage.answer_storage, upload_to='answers/files/'),
+        ),
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'released_at'], name='attempts_fi_refcoun_b3817e_idx')],
+            },
+        ),
+    ]
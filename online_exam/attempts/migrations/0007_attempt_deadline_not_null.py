@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    # Attempts created since 0003 through paths that skip save()
+    Attempt = apps.get_model('attempts', 'Attempt')
+    batch = []
+    for attempt in Attempt.objects.filter(deadline__isnull=True).select_related('exam').iterator(chunk_size=1000):
+        attempt.deadline = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+        batch.append(attempt)
+        if len(batch) >= 1000:
+            Attempt.objects.bulk_update(batch, ['deadline'])
+            batch = []
+    Attempt.objects.bulk_update(batch, ['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0006_file_blob'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True),
+        ),
+    ]
@@ -2,8 +2,11 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+import os
+from datetime import timedelta
 
 from questions.models import Exam, Question, Choice
+from .storage import answer_storage
 
 class Attempt(models.Model):
     STATUS_CHOICES = (
@@ -19,15 +22,44 @@ class Attempt(models.Model):
     submitted_at = models.DateTimeField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="in_progress")
     total_score = models.FloatField(blank=True, null=True)
+    autosave_version = models.PositiveIntegerField(default=0)
+    # Filled in by save() from start_time and the exam duration
+    deadline = models.DateTimeField(blank=True)
 
     class Meta:
         unique_together = ("student", "exam")
         ordering = ("-start_time",)
+        indexes = [
+            models.Index(fields=["status", "deadline"]),
+            models.Index(fields=["student", "-start_time"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.deadline is None and self.exam_id:
+            self.deadline = self.start_time + timedelta(minutes=self.exam.duration_minutes)
+        super().save(*args, **kwargs)
 
     def submit(self):
-        self.submitted_at = timezone.now()
-        self.status = "submitted"
-        self.save()
+        """
+        Submit the attempt if it is still in progress; returns False when it
+        was already closed (by the sweeper or another request) meanwhile.
+        """
+        from .signals import send_status_changed
+
+        # Never later than the deadline, like the sweeper
+        submitted_at = min(timezone.now(), self.deadline)
+        updated = Attempt.objects.filter(pk=self.pk, status="in_progress").update(
+            status="submitted", submitted_at=submitted_at
+        )
+        if updated:
+            # update() skips post_save, so report the status change explicitly
+            send_status_changed(self.exam_id, "in_progress", "submitted")
+            self.status = "submitted"
+            self.submitted_at = submitted_at
+        else:
+            self.refresh_from_db(fields=["status", "submitted_at"])
+        self._saved_status = self.status
+        return bool(updated)
 
     def __str__(self):
         return f"Attempt: {self.student} - {self.exam}"
@@ -37,7 +69,7 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.PROTECT)
     text_answer = models.TextField(blank=True, null=True)
     selected_choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, blank=True, null=True)
-    uploaded_file = models.FileField(upload_to="answers/files/", blank=True, null=True)
+    uploaded_file = models.FileField(upload_to="answers/files/", storage=answer_storage, max_length=255, blank=True, null=True)
     score = models.FloatField(blank=True, null=True)
     graded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="graded_answers")
     graded_at = models.DateTimeField(blank=True, null=True)
@@ -47,9 +79,49 @@ class Answer(models.Model):
     class Meta:
         unique_together = ("attempt", "question")
 
+    @property
+    def file_name(self):
+        """Name the file was uploaded under, without its storage path"""
+        return os.path.basename(self.uploaded_file.name) if self.uploaded_file else ''
+
     def mark_needs_manual(self):
         self.needs_manual = True
         self.save()
 
     def __str__(self):
         return f"Answer Q{self.question_id} by {self.attempt.student}"
+
+
+class UploadSession(models.Model):
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["completed_at", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.offset}/{self.size})"
+
+
+class FileBlob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refcount", "released_at"]),
+        ]
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.refcount} refs)"
@@ -0,0 +1,102 @@
+# attempts/signals.py
+from datetime import timedelta
+
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .blobs import release_blob, retain_blob
+from .models import Attempt, Answer
+from questions.models import Exam
+
+# Sent whenever attempts move between statuses, with the keyword arguments
+# exam_id, old_status, new_status and count. old_status is None for new
+# attempts and new_status is None for deleted ones. Code that changes
+# statuses with bulk_update()/update() must call send_status_changed itself.
+attempt_status_changed = Signal()
+
+_UNKNOWN = object()
+
+
+def send_status_changed(exam_id, old_status, new_status, count=1):
+    if old_status != new_status and count:
+        attempt_status_changed.send(
+            sender=Attempt,
+            exam_id=exam_id,
+            old_status=old_status,
+            new_status=new_status,
+            count=count
+        )
+
+
+@receiver(post_init, sender=Attempt)
+def remember_status(sender, instance, **kwargs):
+    # Read __dict__ so a deferred status field is not loaded just for this
+    if instance.pk is None:
+        instance._saved_status = None
+    else:
+        instance._saved_status = instance.__dict__.get('status', _UNKNOWN)
+
+
+@receiver(post_save, sender=Attempt)
+def attempt_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    old_status = None if created else instance._saved_status
+    if old_status is not _UNKNOWN:
+        send_status_changed(instance.exam_id, old_status, instance.status)
+    instance._saved_status = instance.status
+
+
+@receiver(post_delete, sender=Attempt)
+def attempt_deleted(sender, instance, **kwargs):
+    if instance._saved_status is not _UNKNOWN:
+        send_status_changed(instance.exam_id, instance._saved_status, None)
+
+
+def _file_name(instance):
+    # Raw string until the descriptor wraps it in a FieldFile
+    value = instance.__dict__.get('uploaded_file', _UNKNOWN)
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Answer)
+def remember_file(sender, instance, **kwargs):
+    instance._saved_file = _file_name(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Answer)
+def answer_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'uploaded_file' not in update_fields:
+        return
+    name = _file_name(instance)
+    if name is _UNKNOWN:
+        return
+    if name != instance._saved_file:
+        retain_blob(name)
+        if instance._saved_file is not _UNKNOWN:
+            release_blob(instance._saved_file)
+    instance._saved_file = name
+
+
+@receiver(post_delete, sender=Answer)
+def answer_deleted(sender, instance, **kwargs):
+    if instance._saved_file is not _UNKNOWN:
+        release_blob(instance._saved_file)
+
+
+@receiver(post_init, sender=Exam)
+def remember_duration(sender, instance, **kwargs):
+    instance._saved_duration = instance.__dict__.get('duration_minutes') if instance.pk else None
+
+
+@receiver(post_save, sender=Exam)
+def reschedule_deadlines(sender, instance, created, **kwargs):
+    """Move the deadline of running attempts when the exam duration changes"""
+    # A deferred duration is neither loaded nor compared
+    duration = instance.__dict__.get('duration_minutes')
+    if not created and None not in (instance._saved_duration, duration) and instance._saved_duration != duration:
+        Attempt.objects.filter(exam=instance, status='in_progress').update(
+            deadline=F('start_time') + timedelta(minutes=duration)
+        )
+    instance._saved_duration = duration
@@ -0,0 +1,117 @@
+# attempts/storage.py
+"""
+Content-addressed storage for answer files.
+
+Every distinct file content is stored once, under its SHA-256:
+
+    MEDIA_ROOT/answers/blobs/3f/3fa9...e1
+
+The name handed back to the FileField adds the original file name, so it can
+still be shown and downloaded under that name:
+
+    answers/blobs/3f/3fa9...e1/scan.pdf
+
+Saving the same content again (an autosave re-sending a file, or the same
+file given for two questions) reuses the blob. Blobs are shared, so
+delete() leaves them alone; attempts.blobs counts the answers referring to
+each blob and collect_file_blobs removes the unreferenced ones. Names that
+are not blob names (files stored before this backend) behave as in
+FileSystemStorage.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+
+BLOB_DIR = 'answers/blobs'
+BLOB_NAME = re.compile(r'^answers/blobs/[0-9a-f]{2}/([0-9a-f]{64})/[^/]+$')
+MAX_FILENAME_LENGTH = 150
+READ_SIZE = 64 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def blob_sha256(name):
+    """SHA-256 of the content behind a blob name, None for other names"""
+    match = BLOB_NAME.match(name or '')
+    return match.group(1) if match else None
+
+
+def blob_relative_path(sha256):
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_path(self, sha256):
+        return super().path(blob_relative_path(sha256))
+
+    def blob_root(self):
+        return super().path(BLOB_DIR)
+
+    def path(self, name):
+        sha256 = blob_sha256(name)
+        return self.blob_path(sha256) if sha256 else super().path(name)
+
+    def url(self, name):
+        sha256 = blob_sha256(name)
+        return super().url(blob_relative_path(sha256) if sha256 else name)
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, so there is nothing to avoid
+        return name
+
+    def delete(self, name):
+        if not blob_sha256(name):
+            super().delete(name)
+
+    def _save(self, name, content):
+        filename = os.path.basename(name)
+        stem, ext = os.path.splitext(filename)
+        filename = stem[:max(1, MAX_FILENAME_LENGTH - len(ext))] + ext
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (a finished chunked upload or a large form upload): move it
+            source = content.temporary_file_path()
+            sha256 = getattr(content, 'sha256', None) or file_sha256(source)
+            temporary = False
+        else:
+            os.makedirs(self.blob_root(), exist_ok=True)
+            fd, source = tempfile.mkstemp(dir=self.blob_root(), suffix='.tmp')
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    fh.write(chunk)
+            sha256 = digest.hexdigest()
+            temporary = True
+
+        target = self.blob_path(sha256)
+        if os.path.exists(target):
+            # Reused: a fresh mtime keeps the blob away from the garbage collector
+            os.utime(target)
+            if temporary:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if temporary:
+                os.replace(source, target)
+            else:
+                file_move_safe(source, target, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(target, self.file_permissions_mode)
+
+        return f'{blob_relative_path(sha256)}/{filename}'
+
+
+def answer_storage():
+    return storages['answers']
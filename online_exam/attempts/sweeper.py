@@ -0,0 +1,63 @@
+# attempts/sweeper.py
+"""
+Closing of expired attempts.
+
+Every attempt stores its deadline (start_time + exam duration) in an indexed
+column, so the attempts that ran out of time are found with one range scan
+on (status, deadline) and closed with one UPDATE per exam and batch, no
+matter whether the student ever comes back to the exam page.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Attempt
+from .signals import send_status_changed
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def expired_attempts(now=None):
+    if now is None:
+        now = timezone.now()
+    return Attempt.objects.filter(status='in_progress', deadline__lte=now)
+
+
+def close_expired_attempts(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Submit every in-progress attempt whose deadline has passed.
+    The submission time is the deadline itself, not the time of the sweep.
+    Returns the number of closed attempts and the ids of the affected exams.
+    """
+    if now is None:
+        now = timezone.now()
+
+    closed = 0
+    exam_ids = set()
+    while True:
+        batch = list(expired_attempts(now).order_by('deadline').values_list('pk', 'exam_id')[:batch_size])
+        if not batch:
+            break
+
+        by_exam = defaultdict(list)
+        for attempt_id, exam_id in batch:
+            by_exam[exam_id].append(attempt_id)
+
+        with transaction.atomic():
+            for exam_id, attempt_ids in by_exam.items():
+                # The status filter makes a concurrent manual submit win the race
+                updated = Attempt.objects.filter(pk__in=attempt_ids, status='in_progress').update(
+                    status='submitted', submitted_at=F('deadline')
+                )
+                if updated:
+                    # update() skips post_save, so report the status changes explicitly
+                    send_status_changed(exam_id, 'in_progress', 'submitted', updated)
+                    closed += updated
+                    exam_ids.add(exam_id)
+
+        if len(batch) < batch_size:
+            break
+
+    return closed, exam_ids
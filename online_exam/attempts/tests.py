@@ -1,3 +1,336 @@
-from django.test import TestCase
+# attempts/tests.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from dashboard.models import ExamStats
+from grading.models import GradingJob
+from questions.models import Exam, Question, Choice
+from .availability import available_exams_query, get_available_exams
+from .blobs import collect_blobs, recount_blobs
+from .models import Attempt, Answer, FileBlob, UploadSession
+from .storage import answer_storage
+from .sweeper import close_expired_attempts
+from .uploads import partial_path
+
+
+class ExamTestCase(TestCase):
+    """An open exam with a short, a multiple-choice and a file question, and a logged in student"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pass', role='teacher')
+        self.student = User.objects.create_user('student', password='pass', role='student')
+        self.exam = Exam.objects.create(
+            title='Exam', topic='math', teacher=self.teacher, published=True,
+            start_at=timezone.now() - timedelta(minutes=5), duration_minutes=60,
+        )
+        self.short = Question.objects.create(exam=self.exam, text='short', qtype='short', auto_grade_regex='abc', order=1)
+        self.mcq = Question.objects.create(exam=self.exam, text='mcq', qtype='mcq', max_score=2, order=2)
+        self.right = Choice.objects.create(question=self.mcq, text='right', is_correct=True)
+        self.wrong = Choice.objects.create(question=self.mcq, text='wrong')
+        self.file = Question.objects.create(exam=self.exam, text='file', qtype='file', order=3)
+        self.client.login(username='student', password='pass')
+
+    def autosave(self, attempt, version, answers):
+        return self.client.post(
+            reverse('attempts:autosave', args=[attempt.pk]),
+            json.dumps({'version': version, 'answers': answers}),
+            content_type='application/json',
+        )
+
+
+class AutosaveTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt = Attempt.objects.create(student=self.student, exam=self.exam)
+        for question in (self.short, self.mcq, self.file):
+            Answer.objects.create(attempt=self.attempt, question=question)
+
+    def test_saves_text_and_choice_answers(self):
+        response = self.autosave(self.attempt, 1, {
+            str(self.short.pk): 'ABC',
+            str(self.mcq.pk): str(self.right.pk),
+            str(self.file.pk): 'ignored',
+        })
+        self.assertEqual(response.json(), {'version': 1, 'accepted': True, 'saved': 2})
+        self.assertEqual(Answer.objects.get(question=self.short).text_answer, 'ABC')
+        self.assertEqual(Answer.objects.get(question=self.mcq).selected_choice_id, self.right.pk)
+
+    def test_rejects_stale_version(self):
+        self.autosave(self.attempt, 1, {str(self.short.pk): 'new'})
+        response = self.autosave(self.attempt, 1, {str(self.short.pk): 'old'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Answer.objects.get(question=self.short).text_answer, 'new')
+
+    def test_ignores_choice_of_another_question(self):
+        response = self.autosave(self.attempt, 1, {str(self.mcq.pk): '999999'})
+        self.assertEqual(response.json()['saved'], 0)
+        self.assertIsNone(Answer.objects.get(question=self.mcq).selected_choice_id)
+        self.assertEqual(Answer.objects.count(), 3)
+
+    def test_rejects_after_deadline(self):
+        Attempt.objects.filter(pk=self.attempt.pk).update(deadline=timezone.now() - timedelta(seconds=1))
+        response = self.autosave(self.attempt, 1, {str(self.short.pk): 'late'})
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.json()['expired'])
+        self.assertFalse(Answer.objects.get(question=self.short).text_answer)
+
+
+class StartExamTests(ExamTestCase):
+    def test_creates_one_answer_per_question(self):
+        response = self.client.post(reverse('attempts:start_exam', args=[self.exam.pk]))
+        attempt = Attempt.objects.get()
+        self.assertRedirects(response, reverse('attempts:take_exam', args=[attempt.pk]), fetch_redirect_response=False)
+        self.assertEqual(
+            set(attempt.answers.values_list('question_id', flat=True)),
+            {self.short.pk, self.mcq.pk, self.file.pk},
+        )
+
+    def test_second_start_does_not_duplicate(self):
+        url = reverse('attempts:start_exam', args=[self.exam.pk])
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('attempts:my_attempts'), fetch_redirect_response=False)
+        self.assertEqual(Attempt.objects.count(), 1)
+        self.assertEqual(Answer.objects.count(), 3)
+
+
+class AvailableExamsTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.ended = Exam.objects.create(
+            title='Ended', teacher=self.teacher, published=True,
+            start_at=timezone.now() - timedelta(hours=2), duration_minutes=60,
+        )
+        Exam.objects.create(title='Draft', teacher=self.teacher, start_at=timezone.now() - timedelta(minutes=5), duration_minutes=60)
+        Exam.objects.create(title='Later', teacher=self.teacher, published=True, start_at=timezone.now() + timedelta(days=1), duration_minutes=60)
+
+    def test_published_started_and_not_attempted(self):
+        self.assertEqual(set(available_exams_query(self.student)), {self.exam, self.ended})
+        self.assertEqual(list(available_exams_query(self.student, open_only=True)), [self.exam])
+        Attempt.objects.create(student=self.student, exam=self.exam)
+        self.assertEqual(list(available_exams_query(self.student)), [self.ended])
+
+    def test_cached_list_is_dropped_when_starting_an_exam(self):
+        self.assertEqual(len(get_available_exams(self.student)), 2)
+        with self.assertNumQueries(0):
+            get_available_exams(self.student)
+        self.client.post(reverse('attempts:start_exam', args=[self.exam.pk]))
+        self.assertEqual(get_available_exams(self.student), [self.ended])
+
+
+@override_settings(EVENT_STREAM_INTERVAL=0.01, EVENT_STREAM_MAX_AGE=0.05)
+class AttemptEventsTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt = Attempt.objects.create(student=self.student, exam=self.exam)
+        self.url = reverse('attempts:events', args=[self.attempt.pk])
+
+    async def read_stream(self):
+        response = await self.async_client.get(self.url)
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    async def test_streams_remaining_time_until_submitted(self):
+        await self.async_client.alogin(username='student', password='pass')
+        body = await self.read_stream()
+        self.assertIn('retry: 3000', body)
+        self.assertGreater(body.count('event: time'), 1)
+        self.assertEqual(body.count('event: unread'), 1)
+
+        await sync_to_async(self.attempt.submit)()
+        body = await self.read_stream()
+        self.assertIn('event: submitted\ndata: {"status": "submitted"}', body)
+        self.assertNotIn('event: time', body)
+
+    def test_wsgi_sends_one_round_and_polls(self):
+        body = b''.join(self.client.get(self.url)).decode()
+        self.assertIn('retry: 10', body)
+        self.assertEqual(body.count('event: time'), 1)
+
+    def test_expired_attempt(self):
+        Attempt.objects.filter(pk=self.attempt.pk).update(deadline=timezone.now())
+        body = b''.join(self.client.get(self.url)).decode()
+        self.assertIn('event: expired', body)
+
+    def test_other_students_attempt_is_hidden(self):
+        User.objects.create_user('other', password='pass', role='student')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ExpiredAttemptsTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.expired = Attempt.objects.create(
+            student=self.student, exam=self.exam, start_time=timezone.now() - timedelta(minutes=61)
+        )
+        self.running = Attempt.objects.create(student=User.objects.create_user('other'), exam=self.exam)
+
+    def counters(self):
+        stats = ExamStats.objects.get(exam=self.exam)
+        return stats.in_progress, stats.submitted
+
+    def test_deadline_is_stored_and_follows_the_duration(self):
+        self.assertEqual(self.expired.deadline, self.expired.start_time + timedelta(minutes=60))
+        exam = Exam.objects.get(pk=self.exam.pk)
+        exam.duration_minutes = 90
+        exam.save()
+        self.running.refresh_from_db()
+        self.assertEqual(self.running.deadline, self.running.start_time + timedelta(minutes=90))
+
+    def test_sweeper_submits_at_the_deadline(self):
+        self.assertEqual(close_expired_attempts(), (1, {self.exam.pk}))
+        self.expired.refresh_from_db()
+        self.running.refresh_from_db()
+        self.assertEqual((self.expired.status, self.expired.submitted_at), ('submitted', self.expired.deadline))
+        self.assertEqual(self.running.status, 'in_progress')
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(close_expired_attempts(), (0, set()))
+
+    def test_late_submit_loses_to_the_sweeper(self):
+        stale = Attempt.objects.get(pk=self.expired.pk)
+        close_expired_attempts()
+        self.assertFalse(stale.submit())
+        self.assertEqual((stale.status, stale.submitted_at), ('submitted', stale.deadline))
+        self.assertTrue(self.running.submit())
+        self.assertFalse(self.running.submit())
+        # Each attempt moved once
+        self.assertEqual(self.counters(), (0, 2))
+
+    def test_command_queues_grading(self):
+        call_command('close_expired_attempts', '--grade', stdout=StringIO())
+        self.assertEqual(Attempt.objects.get(pk=self.expired.pk).status, 'submitted')
+        self.assertEqual(GradingJob.objects.filter(exam=self.exam).count(), 1)
+
+
+class TemporaryMediaMixin:
+    """Store uploaded files in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+@override_settings(ANSWER_UPLOAD_CHUNK_SIZE=1000)
+class ChunkedUploadTests(TemporaryMediaMixin, ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt = Attempt.objects.create(student=self.student, exam=self.exam)
+        self.answer = Answer.objects.create(attempt=self.attempt, question=self.file)
+        self.data = os.urandom(2500)
+
+    def start(self, filename='../scan 1.pdf', size=2500, sha256=''):
+        return self.client.post(
+            reverse('attempts:start_upload', args=[self.attempt.pk]),
+            {'question': self.file.pk, 'filename': filename, 'size': size, 'sha256': sha256},
+            content_type='application/json',
+        ).json()
+
+    def put(self, session, start, end, data=None, checksum=None):
+        headers = {'Upload-Offset': str(start)}
+        if checksum:
+            headers['Upload-Checksum'] = checksum
+        body = (data or self.data)[start:end]
+        return self.client.put(session['url'], body, content_type='application/octet-stream', headers=headers)
+
+    def test_resumable_upload(self):
+        session = self.start(sha256=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(session['offset'], 0)
+        self.assertEqual(self.put(session, 0, 1000).json()['offset'], 1000)
+
+        # A repeated chunk is refused with the offset to continue from
+        response = self.put(session, 0, 1000)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 1000))
+        self.assertEqual(self.put(session, 1000, 2500).status_code, 413)
+
+        resumed = self.start(sha256=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual((resumed['upload_id'], resumed['offset']), (session['upload_id'], 1000))
+        self.put(session, 1000, 2000)
+        self.assertTrue(self.put(session, 2000, 2500).json()['complete'])
+
+        self.answer.refresh_from_db()
+        self.assertTrue(self.answer.uploaded_file.name.endswith('/scan_1.pdf'))
+        self.assertEqual(self.answer.uploaded_file.read(), self.data)
+        self.assertFalse(os.path.exists(partial_path(UploadSession.objects.get())))
+
+    def test_corrupted_file_is_rejected(self):
+        session = self.start(size=10, sha256='0' * 64)
+        response = self.put(session, 0, 10)
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_corrupted_chunk_is_dropped(self):
+        session = self.start(size=1500)
+        digest = hashlib.sha256(self.data[:1000]).hexdigest()
+        self.assertEqual(self.put(session, 0, 1000, checksum=f'sha256 {digest}').json()['offset'], 1000)
+
+        digest = hashlib.sha256(self.data[1000:1500]).hexdigest()
+        corrupted = self.data[:1000] + b'x' + self.data[1001:]
+        response = self.put(session, 1000, 1500, data=corrupted, checksum=f'sha256 {digest}')
+        self.assertEqual((response.status_code, response.json()['offset']), (422, 1000))
+        self.assertEqual(os.path.getsize(partial_path(UploadSession.objects.get())), 1000)
+
+        self.assertEqual(self.put(session, 1000, 1500, checksum='md5 abc').status_code, 400)
+        self.assertTrue(self.put(session, 1000, 1500, checksum=f'sha256 {digest}').json()['complete'])
+
+    def test_sessions_are_private(self):
+        session = self.start()
+        User.objects.create_user('other', password='pass', role='student')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(session['url']).status_code, 404)
+        self.assertEqual(self.put(session, 0, 1000).status_code, 404)
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        attempt = Attempt.objects.create(student=self.student, exam=self.exam)
+        self.first = Answer.objects.create(attempt=attempt, question=self.file)
+        self.second = Answer.objects.create(attempt=attempt, question=self.short)
+        self.sha256 = hashlib.sha256(b'hello').hexdigest()
+
+    def test_same_content_is_stored_once(self):
+        self.first.uploaded_file.save('scan.pdf', ContentFile(b'hello'), save=True)
+        self.second.uploaded_file.save('other.pdf', ContentFile(b'hello'), save=True)
+        self.assertEqual(self.first.uploaded_file.name, f'answers/blobs/{self.sha256[:2]}/{self.sha256}/scan.pdf')
+        self.assertEqual(FileBlob.objects.get().refcount, 2)
+        self.assertEqual(os.listdir(os.path.dirname(answer_storage().blob_path(self.sha256))), [self.sha256])
+        self.assertEqual(Answer.objects.get(pk=self.second.pk).uploaded_file.read(), b'hello')
+
+    def test_released_blob_is_collected_after_the_grace_period(self):
+        self.first.uploaded_file.save('scan.pdf', ContentFile(b'hello'), save=True)
+        self.second.uploaded_file.save('other.pdf', ContentFile(b'hello'), save=True)
+        # Replacing one file and deleting the other answer releases the blob
+        self.first.uploaded_file.save('scan.pdf', ContentFile(b'world'), save=True)
+        self.assertEqual(FileBlob.objects.get(pk=self.sha256).refcount, 1)
+        Answer.objects.get(pk=self.second.pk).delete()
+        self.assertEqual(FileBlob.objects.get(pk=self.sha256).refcount, 0)
+
+        self.assertEqual(collect_blobs(timedelta(hours=1)), (0, 0))
+        self.assertEqual(collect_blobs(timedelta(seconds=-10)), (1, 5))
+        self.assertFalse(os.path.exists(answer_storage().blob_path(self.sha256)))
+        self.assertFalse(FileBlob.objects.filter(pk=self.sha256).exists())
+
+    def test_recount_restores_lost_rows(self):
+        self.first.uploaded_file.save('scan.pdf', ContentFile(b'hello'), save=True)
+        FileBlob.objects.all().delete()
+        self.assertEqual(recount_blobs(), 1)
+        self.assertEqual(FileBlob.objects.get().refcount, 1)
@@ -0,0 +1,205 @@
+# attempts/uploads.py
+"""
+Chunked, resumable uploads of file answers.
+
+The client opens an UploadSession for one answer, declaring the file name,
+size and (optionally) its SHA-256, then PUTs the file in chunks, each tagged
+with the byte offset it starts at and (optionally) the chunk's own SHA-256.
+Chunks are streamed into a partial file under MEDIA_ROOT/answers/uploads/,
+so memory use is bounded by the read buffer however large the file is, and
+an interrupted upload continues from the offset the session has recorded. When the last byte arrives the file is
+hashed, checked against the declared checksum and moved into place as the
+answer's uploaded_file. Saving the other answers never touches files.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import UploadSession
+from .storage import file_sha256
+
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+READ_SIZE = 64 * 1024
+PARTIAL_DIR = os.path.join('answers', 'uploads')
+SHA256 = re.compile('^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class PartialFile(File):
+    """A finished partial file; file system storage moves it into place instead of copying it"""
+
+    def __init__(self, file, sha256=None):
+        super().__init__(file)
+        # Already verified, so the storage does not hash the file again
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def max_upload_size():
+    return getattr(settings, 'ANSWER_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def upload_chunk_size():
+    return getattr(settings, 'ANSWER_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def partial_dir():
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR)
+
+
+def partial_path(session):
+    return os.path.join(partial_dir(), f'{session.pk}.part')
+
+
+def _remove_partial(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def start_upload(answer, filename, size, sha256=''):
+    """
+    Open an upload session for an answer, or resume the unfinished one for
+    the same file. Sessions of other files for the answer are dropped.
+    """
+    filename = get_valid_filename(os.path.basename(filename or ''))[-100:]
+    sha256 = (sha256 or '').lower()
+    if not filename:
+        raise UploadError('نام فایل معتبر نیست')
+    if size <= 0:
+        raise UploadError('فایل خالی است')
+    if size > max_upload_size():
+        raise UploadError(f'حجم فایل بیشتر از {max_upload_size() // (1024 * 1024)} مگابایت است', status=413)
+    if sha256 and not SHA256.match(sha256):
+        raise UploadError('checksum نامعتبر است')
+
+    unfinished = answer.upload_sessions.filter(completed_at__isnull=True)
+    for session in unfinished:
+        if (session.filename, session.size, session.sha256) == (filename, size, sha256):
+            # The partial file is the truth if it is shorter than the recorded offset
+            path = partial_path(session)
+            written = os.path.getsize(path) if os.path.exists(path) else 0
+            if written < session.offset:
+                session.offset = written
+                session.save(update_fields=['offset', 'updated_at'])
+            return session
+        _remove_partial(session)
+        session.delete()
+
+    session = UploadSession.objects.create(answer=answer, filename=filename, size=size, sha256=sha256)
+    os.makedirs(partial_dir(), exist_ok=True)
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length, sha256=''):
+    """
+    Append `length` bytes read from `stream` at `offset`; returns the new
+    offset. A chunk cut short by the client still advances the offset by
+    what arrived, so the retry only sends the rest. A chunk sent with its
+    SHA-256 is hashed as it is written and dropped unless it arrives whole
+    and matches, so corruption is caught (and resent) one chunk at a time.
+    """
+    sha256 = (sha256 or '').lower()
+    if session.completed_at:
+        raise UploadError('آپلود این فایل کامل شده است', status=409)
+    if offset != session.offset:
+        raise UploadError('offset با وضعیت آپلود هم‌خوانی ندارد', status=409)
+    if length is None or length <= 0:
+        raise UploadError('طول قطعه مشخص نیست', status=411)
+    if length > upload_chunk_size():
+        raise UploadError('حجم قطعه بیش از حد مجاز است', status=413)
+    if offset + length > session.size:
+        raise UploadError('حجم قطعه از حجم اعلام‌شده فایل بیشتر است')
+    if sha256 and not SHA256.match(sha256):
+        raise UploadError('checksum نامعتبر است')
+
+    written = 0
+    digest = hashlib.sha256()
+    with open(partial_path(session), 'r+b') as fh:
+        fh.seek(offset)
+        while written < length:
+            block = stream.read(min(READ_SIZE, length - written))
+            if not block:
+                break
+            fh.write(block)
+            digest.update(block)
+            written += len(block)
+        if sha256 and (written < length or digest.hexdigest() != sha256):
+            fh.truncate(offset)
+            raise UploadError('checksum قطعه دریافت‌شده با قطعه ارسالی یکسان نیست', status=422)
+        fh.truncate()
+
+    # Only one writer may move the offset; a concurrent chunk for the same offset loses
+    now = timezone.now()
+    moved = UploadSession.objects.filter(pk=session.pk, offset=offset, completed_at__isnull=True).update(
+        offset=offset + written, updated_at=now
+    )
+    if not moved:
+        session.refresh_from_db(fields=['offset', 'completed_at'])
+        raise UploadError('قطعه دیگری همزمان ثبت شد', status=409)
+    session.offset = offset + written
+    session.updated_at = now
+    return session.offset
+
+
+def finish_upload(session):
+    """
+    Verify a fully received file and attach it to its answer. On a checksum
+    mismatch the session is discarded and the client starts over.
+    """
+    path = partial_path(session)
+    digest = file_sha256(path)
+    if session.sha256 and digest != session.sha256:
+        _remove_partial(session)
+        session.delete()
+        raise UploadError('checksum فایل دریافت‌شده با فایل ارسالی یکسان نیست', status=422)
+
+    answer = session.answer
+    with transaction.atomic():
+        with open(path, 'rb') as fh:
+            answer.uploaded_file.save(session.filename, PartialFile(fh, digest), save=False)
+        answer.save(update_fields=['uploaded_file'])
+        session.sha256 = digest
+        session.completed_at = timezone.now()
+        session.save(update_fields=['sha256', 'completed_at', 'updated_at'])
+    # A storage that copies instead of moving leaves the partial file behind
+    _remove_partial(session)
+    return answer
+
+
+def prune_upload_sessions(max_age=timedelta(days=1)):
+    """
+    Delete sessions idle for longer than max_age, with their partial files,
+    and partial files no session refers to. Returns the number of sessions.
+    """
+    cutoff = timezone.now() - max_age
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+    deleted = 0
+    for session in stale.iterator():
+        _remove_partial(session)
+        deleted += 1
+    stale.delete()
+
+    if os.path.isdir(partial_dir()):
+        live = {f'{pk}.part' for pk in UploadSession.objects.filter(completed_at__isnull=True).values_list('pk', flat=True)}
+        for entry in os.scandir(partial_dir()):
+            if entry.name.endswith('.part') and entry.name not in live and entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+    return deleted
@@ -10,5 +10,10 @@ urlpatterns = [
     path('<int:attempt_pk>/take/', views.TakeExamView.as_view(), name='take_exam'),
     path('<int:attempt_pk>/result/', views.AttemptResultView.as_view(), name='attempt_result'),
     path('my/', views.MyAttemptsView.as_view(), name='my_attempts'),
+    path('<int:attempt_pk>/rank/', views.attempt_rank, name='rank'),
     path('<int:attempt_pk>/time/', views.get_remaining_time, name='remaining_time'),
+    path('<int:attempt_pk>/uploads/', views.start_upload_session, name='start_upload'),
+    path('uploads/<int:upload_pk>/', views.UploadChunkView.as_view(), name='upload_chunk'),
+    path('<int:attempt_pk>/autosave/', views.autosave_answers, name='autosave'),
+    path('<int:attempt_pk>/events/', views.attempt_events, name='events'),
 ]
\ No newline at end of file
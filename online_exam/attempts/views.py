@@ -1,16 +1,28 @@
 # attempts/views.py
+import asyncio
+import json
+import time
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
+from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
 
-from .models import Attempt, Answer
+from .models import Attempt, Answer, UploadSession
 from .forms import ShortAnswerForm, MCQAnswerForm, FileAnswerForm
-from questions.models import Exam, Question
+from .availability import get_available_exams, invalidate_available_exams
+from .uploads import UploadError, finish_upload, max_upload_size, start_upload, upload_chunk_size, write_chunk
+from questions.models import Exam, Question, Choice
+from questions.papers import get_exam_paper
+from notifications.counters import aget_unread_count
+from grading.ranking import get_ranking
+from online_exam.pagination import paginate_request
+from notifications.events import can_stream, sse_event, sse_response, sse_retry, stream_interval, stream_max_age
 
 
 def student_required(view_func):
@@ -30,14 +42,7 @@ class ExamListView(View):
     template_name = 'attempts/exam_list.html'
 
     def get(self, request):
-        now = timezone.now()
-        taken_exam_ids = Attempt.objects.filter(student=request.user).values_list('exam_id', flat=True)
-        
-        available_exams = Exam.objects.filter(
-            published=True,
-            start_at__lte=now
-        ).exclude(id__in=taken_exam_ids)
-        
+        available_exams = get_available_exams(request.user)
         return render(request, self.template_name, {'exams': available_exams})
 
 
@@ -62,26 +67,24 @@ class StartExamView(View):
     def post(self, request, exam_pk):
         exam = get_object_or_404(Exam, pk=exam_pk, published=True)
         
-        # Check if already attempted
-        existing_attempt = Attempt.objects.filter(student=request.user, exam=exam).first()
-        if existing_attempt:
+        # Create the attempt and its empty answers in one transaction; the
+        # unique (student, exam) constraint rejects a second attempt.
+        try:
+            with transaction.atomic():
+                attempt = Attempt.objects.create(
+                    student=request.user,
+                    exam=exam,
+                    status='in_progress'
+                )
+                Answer.objects.bulk_create(
+                    Answer(attempt=attempt, question_id=question_id)
+                    for question_id in exam.questions.values_list('id', flat=True)
+                )
+        except IntegrityError:
             messages.warning(request, 'شما قبلاً در این آزمون شرکت کرده‌اید.')
             return redirect('attempts:my_attempts')
         
-        # Create new attempt
-        attempt = Attempt.objects.create(
-            student=request.user,
-            exam=exam,
-            status='in_progress'
-        )
-        
-        # Create empty answers for all questions
-        for question in exam.questions.all():
-            Answer.objects.create(
-                attempt=attempt,
-                question=question
-            )
-        
+        invalidate_available_exams(request.user.pk)
         messages.success(request, 'آزمون شروع شد. موفق باشید!')
         return redirect('attempts:take_exam', attempt_pk=attempt.pk)
 
@@ -91,35 +94,38 @@ class TakeExamView(View):
     template_name = 'attempts/take_exam.html'
 
     def get(self, request, attempt_pk):
-        attempt = get_object_or_404(Attempt, pk=attempt_pk, student=request.user)
+        attempt = get_object_or_404(
+            Attempt.objects.select_related('exam'),
+            pk=attempt_pk,
+            student=request.user
+        )
         
         if attempt.status != 'in_progress':
             messages.warning(request, 'این آزمون قبلاً ارسال شده است.')
             return redirect('attempts:attempt_result', attempt_pk=attempt.pk)
         
         # Calculate remaining time
-        end_time = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+        end_time = attempt.deadline
         now = timezone.now()
         
         if now >= end_time:
-            # Auto submit if time is up
+            # Auto submit if time is up, unless the sweeper already did
             attempt.submit()
             messages.warning(request, 'زمان آزمون به پایان رسید و پاسخ‌های شما ثبت شد.')
             return redirect('attempts:attempt_result', attempt_pk=attempt.pk)
         
         remaining_seconds = int((end_time - now).total_seconds())
         
-        questions = attempt.exam.questions.all()
+        paper = get_exam_paper(attempt.exam_id)
         answers = {a.question_id: a for a in attempt.answers.all()}
         
-        # Build question list with answers
+        # Merge this student's answers on top of the shared compiled paper
         question_list = []
-        for q in questions:
-            answer = answers.get(q.id)
+        for q in paper['questions']:
             question_list.append({
                 'question': q,
-                'answer': answer,
-                'choices': q.choices.all() if q.qtype == Question.TYPE_MCQ else None
+                'answer': answers.get(q['id']),
+                'choices': q['choices']
             })
         
         return render(request, self.template_name, {
@@ -149,16 +155,22 @@ class TakeExamView(View):
                 if choice_id:
                     answer.selected_choice_id = int(choice_id)
             elif question.qtype == Question.TYPE_FILE:
+                # Only sent by browsers without JavaScript; others upload in chunks
                 file = request.FILES.get(f'question_{question.id}')
-                if file:
+                if file and file.size > max_upload_size():
+                    messages.error(request, f'حجم فایل {file.name} بیش از حد مجاز است.')
+                elif file:
                     answer.uploaded_file = file
             
             answer.save()
         
         # Check if submitting or just saving
         if 'submit' in request.POST:
-            attempt.submit()
-            messages.success(request, 'آزمون با موفقیت ارسال شد.')
+            if attempt.submit():
+                messages.success(request, 'آزمون با موفقیت ارسال شد.')
+            else:
+                # Closed by the sweeper at the deadline while this request ran
+                messages.warning(request, 'زمان آزمون به پایان رسید و پاسخ‌های شما ثبت شد.')
             return redirect('attempts:attempt_result', attempt_pk=attempt.pk)
         
         messages.success(request, 'پاسخ‌ها ذخیره شد.')
@@ -171,7 +183,8 @@ class MyAttemptsView(View):
 
     def get(self, request):
         attempts = Attempt.objects.filter(student=request.user).select_related('exam')
-        return render(request, self.template_name, {'attempts': attempts})
+        page = paginate_request(request, attempts, '-start_time')
+        return render(request, self.template_name, {'attempts': page, 'page': page})
 
 
 @method_decorator([login_required, student_required], name='dispatch')
@@ -181,13 +194,33 @@ class AttemptResultView(View):
     def get(self, request, attempt_pk):
         attempt = get_object_or_404(Attempt, pk=attempt_pk, student=request.user)
         answers = attempt.answers.select_related('question', 'selected_choice').all()
+        ranking = None
+        if attempt.status == 'graded':
+            ranking = get_ranking(attempt.exam_id).position(attempt.total_score or 0)
         
         return render(request, self.template_name, {
             'attempt': attempt,
-            'answers': answers
+            'answers': answers,
+            'ranking': ranking
         })
 
 
+@login_required
+def attempt_rank(request, attempt_pk):
+    """AJAX endpoint to get the rank and percentile of a graded attempt"""
+    attempt = get_object_or_404(Attempt, pk=attempt_pk, student=request.user)
+    
+    if attempt.status != 'graded':
+        return JsonResponse({'error': 'آزمون هنوز تصحیح نشده است'}, status=409)
+    
+    score = attempt.total_score or 0
+    return JsonResponse({
+        'attempt_id': attempt.pk,
+        'score': score,
+        **get_ranking(attempt.exam_id).position(score)
+    })
+
+
 @login_required
 def get_remaining_time(request, attempt_pk):
     """AJAX endpoint to get remaining time"""
@@ -196,11 +229,224 @@ def get_remaining_time(request, attempt_pk):
     if attempt.status != 'in_progress':
         return JsonResponse({'remaining': 0, 'expired': True})
     
-    end_time = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
     now = timezone.now()
-    remaining = max(0, int((end_time - now).total_seconds()))
+    remaining = max(0, int((attempt.deadline - now).total_seconds()))
     
     return JsonResponse({
         'remaining': remaining,
         'expired': remaining <= 0
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+async def attempt_events(request, attempt_pk):
+    """
+    Server-Sent Events stream for an exam in progress: pushes the remaining
+    time, the unread notifications count, and an event when the attempt is
+    submitted (by the student or the server) or its time runs out.
+    """
+    user = await request.auser()
+    try:
+        attempt = await Attempt.objects.aget(pk=attempt_pk, student=user)
+    except Attempt.DoesNotExist:
+        raise Http404
+    end_time = attempt.deadline
+    streaming = can_stream(request)
+
+    async def stream():
+        yield sse_retry(streaming)
+        last_count = None
+        closes_at = time.monotonic() + stream_max_age()
+        while True:
+            status = await Attempt.objects.filter(pk=attempt.pk).values_list('status', flat=True).aget()
+            if status != 'in_progress':
+                yield sse_event('submitted', {'status': status})
+                return
+
+            remaining = max(0, int((end_time - timezone.now()).total_seconds()))
+            if remaining <= 0:
+                yield sse_event('expired', {'remaining': 0})
+                return
+            yield sse_event('time', {'remaining': remaining})
+
+            count = await aget_unread_count(user.pk)
+            if count != last_count:
+                yield sse_event('unread', {'count': count})
+                last_count = count
+
+            if not streaming or time.monotonic() >= closes_at:
+                return
+            await asyncio.sleep(min(stream_interval(), remaining))
+
+    return sse_response(stream())
+
+
+@login_required
+@require_POST
+def autosave_answers(request, attempt_pk):
+    """AJAX endpoint that saves only the answers changed since the last autosave.
+
+    Expects a JSON body like ``{"version": 4, "answers": {"12": "text", "13": "57"}}``
+    where each value is the short answer text or the selected choice id.
+    File answers are ignored here; they go through the chunked upload endpoints.
+    Nothing is saved once the deadline has passed, even before the sweeper
+    closes the attempt.
+    """
+    attempt = get_object_or_404(Attempt, pk=attempt_pk, student=request.user)
+
+    if attempt.status != 'in_progress' or timezone.now() >= attempt.deadline:
+        return JsonResponse({'version': attempt.autosave_version, 'expired': True}, status=409)
+
+    try:
+        payload = json.loads(request.body)
+        version = int(payload['version'])
+        changes = {int(qid): value for qid, value in payload.get('answers', {}).items()}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'error': 'invalid payload'}, status=400)
+
+    # Stale or replayed batch: the client resends its dirty answers with a newer version
+    if version <= attempt.autosave_version:
+        return JsonResponse({'version': attempt.autosave_version, 'accepted': False}, status=409)
+
+    qtypes = dict(
+        attempt.exam.questions.filter(pk__in=list(changes)).values_list('id', 'qtype')
+    )
+
+    mcq_choices = {}
+    for qid, value in changes.items():
+        if qtypes.get(qid) == Question.TYPE_MCQ and str(value).isdigit():
+            mcq_choices[qid] = int(value)
+    valid_choices = set(
+        Choice.objects.filter(
+            question_id__in=list(mcq_choices),
+            pk__in=list(mcq_choices.values())
+        ).values_list('question_id', 'id')
+    )
+
+    answers = []
+    for qid, value in changes.items():
+        qtype = qtypes.get(qid)
+        if qtype == Question.TYPE_SHORT:
+            answers.append(Answer(attempt=attempt, question_id=qid, text_answer=str(value or '')))
+        elif qtype == Question.TYPE_MCQ and (qid, mcq_choices.get(qid)) in valid_choices:
+            answers.append(Answer(attempt=attempt, question_id=qid, selected_choice_id=mcq_choices[qid]))
+
+    with transaction.atomic():
+        accepted = Attempt.objects.filter(
+            pk=attempt.pk,
+            status='in_progress',
+            deadline__gt=timezone.now(),
+            autosave_version__lt=version
+        ).update(autosave_version=version)
+        if not accepted:
+            attempt.refresh_from_db(fields=['autosave_version', 'status', 'deadline'])
+            if attempt.status != 'in_progress' or timezone.now() >= attempt.deadline:
+                return JsonResponse({'version': attempt.autosave_version, 'expired': True}, status=409)
+            return JsonResponse({'version': attempt.autosave_version, 'accepted': False}, status=409)
+
+        # One upsert for all changed answers, keyed on the (attempt, question) constraint
+        Answer.objects.bulk_create(
+            answers,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['text_answer', 'selected_choice'],
+        )
+
+    return JsonResponse({'version': version, 'accepted': True, 'saved': len(answers)})
+
+
+def _upload_state(upload):
+    return {
+        'upload_id': upload.pk,
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': upload_chunk_size(),
+        'complete': upload.completed_at is not None,
+        'url': reverse('attempts:upload_chunk', args=[upload.pk]),
+    }
+
+
+@login_required
+@require_POST
+def start_upload_session(request, attempt_pk):
+    """AJAX endpoint that opens (or resumes) a chunked upload for a file answer.
+
+    Expects a JSON body like ``{"question": 12, "filename": "scan.pdf",
+    "size": 52428800, "sha256": "..."}``; the response tells the client the
+    offset to continue from and where to PUT the chunks.
+    """
+    attempt = get_object_or_404(Attempt, pk=attempt_pk, student=request.user)
+
+    if attempt.status != 'in_progress' or timezone.now() >= attempt.deadline:
+        return JsonResponse({'error': 'آزمون در حال انجام نیست', 'expired': True}, status=409)
+
+    try:
+        payload = json.loads(request.body)
+        question_id = int(payload['question'])
+        size = int(payload['size'])
+        filename = str(payload['filename'])
+        sha256 = str(payload.get('sha256') or '')
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'error': 'invalid payload'}, status=400)
+
+    answer = get_object_or_404(
+        Answer,
+        attempt=attempt,
+        question_id=question_id,
+        question__qtype=Question.TYPE_FILE
+    )
+    try:
+        upload = start_upload(answer, filename, size, sha256)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    return JsonResponse(_upload_state(upload))
+
+
+@method_decorator(login_required, name='dispatch')
+class UploadChunkView(View):
+    """
+    State (GET) and chunks (PUT, raw body with an Upload-Offset header and an
+    optional Upload-Checksum) of an upload session
+    """
+
+    def get_upload(self, request, upload_pk):
+        return get_object_or_404(
+            UploadSession.objects.select_related('answer__attempt'),
+            pk=upload_pk,
+            answer__attempt__student=request.user
+        )
+
+    def get(self, request, upload_pk):
+        return JsonResponse(_upload_state(self.get_upload(request, upload_pk)))
+
+    def put(self, request, upload_pk):
+        upload = self.get_upload(request, upload_pk)
+        attempt = upload.answer.attempt
+
+        if attempt.status != 'in_progress' or timezone.now() >= attempt.deadline:
+            return JsonResponse({'error': 'آزمون در حال انجام نیست', 'expired': True}, status=409)
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset header is required'}, status=400)
+        # "sha256 <hex digest>" of the chunk
+        algorithm, _, sha256 = request.headers.get('Upload-Checksum', '').partition(' ')
+        if algorithm and algorithm.lower() != 'sha256':
+            return JsonResponse({'error': 'unsupported Upload-Checksum algorithm'}, status=400)
+
+        try:
+            # Read from the request stream; request.body would buffer the whole chunk
+            write_chunk(upload, offset, request, length, sha256)
+            if upload.offset == upload.size:
+                finish_upload(upload)
+        except UploadError as e:
+            data = {'error': str(e)}
+            if upload.pk:
+                # Lets the client resume from the server's offset; a rejected file has no session left
+                data.update(_upload_state(upload))
+            return JsonResponse(data, status=e.status)
+
+        return JsonResponse(_upload_state(upload))
@@ -0,0 +1,88 @@
+# dashboard/management/commands/benchmark_search.py
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from dashboard.models import ExamSearchToken
+from dashboard.search import build_tokens, search_exam_ids
+from questions.models import Exam
+
+SYLLABLES = ['با', 'ر', 'سا', 'من', 'تا', 'کی', 'دو', 'لا', 'نو', 'پر', 'شی', 'مو', 'گا', 'زی', 'فر', 'هن', 'دی', 'سو', 'بی', 'کا']
+TOPICS = ['ریاضی', 'فیزیک', 'شیمی', 'برنامه‌نویسی', 'ادبیات', 'زبان', 'تاریخ', 'زیست‌شناسی']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measures exam search latency on synthetic exams (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exams', type=int, default=100000,
+                            help='Number of synthetic published exams')
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Number of random queries to time')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+        # Zipf-like popularity so some words are common and most are rare
+        popularity = [1 / (rank + 1) for rank in range(len(words))]
+
+        def phrase(size):
+            return ' '.join(rng.choices(words, popularity, k=size))
+
+        # Queries are drawn from the text distribution: mostly common words
+        queries = [phrase(rng.randint(1, 2)) for _ in range(options['queries'])]
+
+        try:
+            with transaction.atomic():
+                teacher = User.objects.create_user('benchmark-search-teacher', role='teacher')
+                self.stdout.write(f'Creating {options["exams"]} exams...')
+                started = time.monotonic()
+                now = timezone.now()
+                batch_size = 2000
+                for offset in range(0, options['exams'], batch_size):
+                    exams = Exam.objects.bulk_create([
+                        Exam(
+                            title=phrase(rng.randint(2, 5)),
+                            topic=rng.choice(TOPICS),
+                            description=phrase(rng.randint(5, 20)),
+                            teacher=teacher,
+                            start_at=now + timedelta(minutes=offset + i),
+                            duration_minutes=60,
+                            published=True,
+                        )
+                        for i in range(min(batch_size, options['exams'] - offset))
+                    ])
+                    ExamSearchToken.objects.bulk_create(build_tokens(exams), batch_size=batch_size)
+                self.stdout.write(f'  done in {time.monotonic() - started:.1f}s')
+
+                self.report('search index', [self.timed(search_exam_ids, q) for q in queries])
+                self.report('title__icontains', [
+                    self.timed(lambda q: list(Exam.objects.filter(published=True, title__icontains=q)[:50]), q)
+                    for q in queries
+                ])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def timed(self, func, query):
+        started = time.perf_counter()
+        func(query)
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, label, timings):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms, max {timings[-1]:.2f} ms'
+        ))
@@ -0,0 +1,54 @@
+# dashboard/management/commands/rebuild_dashboard_stats.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from dashboard.models import TeacherStats, ExamStats
+from dashboard.stats import (
+    EXAM_COUNTERS, TEACHER_COUNTERS, compute_all_exam_stats, compute_all_teacher_stats,
+    save_exam_stats, save_teacher_stats,
+)
+from questions.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized dashboard counters from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report counters that drifted, without fixing them')
+
+    def handle(self, *args, **options):
+        teacher_ids = set(User.objects.filter(role='teacher').values_list('pk', flat=True))
+        teacher_ids.update(Exam.objects.values_list('teacher_id', flat=True))
+        teacher_rows = compute_all_teacher_stats(sorted(teacher_ids))
+        exam_rows = compute_all_exam_stats(list(Exam.objects.values_list('pk', flat=True)))
+
+        stored_teachers = {s.pk: s for s in TeacherStats.objects.all()}
+        stored_exams = {s.pk: s for s in ExamStats.objects.all()}
+        drifted = 0
+        for row in teacher_rows:
+            drifted += self.compare(f'teacher {row.pk}', stored_teachers.get(row.pk), row, TEACHER_COUNTERS)
+        for row in exam_rows:
+            drifted += self.compare(f'exam {row.pk}', stored_exams.get(row.pk), row, EXAM_COUNTERS)
+
+        if options['check']:
+            style = self.style.SUCCESS if not drifted else self.style.WARNING
+            self.stdout.write(style(f'{drifted} stats rows out of sync'))
+            return
+
+        with transaction.atomic():
+            save_teacher_stats(teacher_rows)
+            save_exam_stats(exam_rows)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {len(teacher_rows)} teachers and {len(exam_rows)} exams '
+            f'({drifted} rows were out of sync)'
+        ))
+
+    def compare(self, label, stored, fresh, fields):
+        if stored is None:
+            return 0
+        diffs = [f'{f}: {getattr(stored, f)} != {getattr(fresh, f)}' for f in fields if getattr(stored, f) != getattr(fresh, f)]
+        if diffs:
+            self.stdout.write(f'  {label}: ' + ', '.join(diffs))
+        return int(bool(diffs))
@@ -0,0 +1,17 @@
+# dashboard/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from dashboard.search import rebuild_index, rebuild_topic_facets
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the exam search index and topic facets from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of exams indexed per batch')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        topics = rebuild_topic_facets()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} published exams in {topics} topics'))
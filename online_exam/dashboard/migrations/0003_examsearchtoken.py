@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:05
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the tokenizer in dashboard.search at the time of this
+# migration, so later changes there don't alter what it indexes. A changed
+# tokenizer is applied to existing exams with the rebuild_search_index command.
+FIELD_WEIGHTS = (
+    ('title', 5),
+    ('topic', 3),
+    ('description', 1),
+)
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+ZWNJ = '\u200c'
+CHARACTER_MAP = str.maketrans({
+    '\u064a': '\u06cc',
+    '\u0649': '\u06cc',
+    '\u0643': '\u06a9',
+    '\u0629': '\u0647',
+    '\u0640': None,
+    **{chr(0x06f0 + d): str(d) for d in range(10)},
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+TOKEN = re.compile('\\w+(?:\u200c\\w+)*')
+
+
+def tokenize(text):
+    text = DIACRITICS.sub('', (text or '').translate(CHARACTER_MAP))
+    text = re.sub('[\u200b\u200d-\u200f\u202a-\u202e\ufeff]', '', text).casefold()
+    tokens = []
+    for word in TOKEN.findall(text):
+        parts = word.split(ZWNJ)
+        tokens.extend(parts)
+        if len(parts) > 1:
+            tokens.append(''.join(parts))
+    return [token[:MAX_TOKEN_LENGTH] for token in tokens if len(token) >= MIN_TOKEN_LENGTH]
+
+
+def exam_tokens(exam):
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in set(tokenize(getattr(exam, field))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def index_published_exams(apps, schema_editor):
+    Exam = apps.get_model('questions', 'Exam')
+    ExamSearchToken = apps.get_model('dashboard', 'ExamSearchToken')
+    for exam in Exam.objects.filter(published=True).iterator(chunk_size=1000):
+        ExamSearchToken.objects.bulk_create([
+            ExamSearchToken(exam_id=exam.pk, token=token, weight=weight)
+            for token, weight in exam_tokens(exam).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_teacherstats_examstats'),
+        ('questions', '0003_exam_teacher_start_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='questions.exam')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='examsearchtoken',
+            index=models.Index(fields=['token', '-weight', 'exam'], name='dashboard_e_token_ac16c2_idx'),
+        ),
+        migrations.RunPython(index_published_exams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_topics(apps, schema_editor):
+    Exam = apps.get_model('questions', 'Exam')
+    TopicFacet = apps.get_model('dashboard', 'TopicFacet')
+    counts = Exam.objects.filter(published=True).exclude(topic='').values('topic').annotate(
+        count=Count('id')
+    ).order_by()
+    TopicFacet.objects.bulk_create(
+        [TopicFacet(topic=row['topic'], published_count=row['count']) for row in counts]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_examsearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicFacet',
+            fields=[
+                ('topic', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('published_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('topic',),
+            },
+        ),
+        migrations.RunPython(count_topics, migrations.RunPython.noop),
+    ]
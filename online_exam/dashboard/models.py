@@ -3,6 +3,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from questions.models import Exam
+
 
 class DashboardPreference(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="dashboard_pref")
@@ -19,3 +21,52 @@ class ExamViewHistory(models.Model):
 
     def __str__(self):
         return f"{self.user} viewed exam {self.exam_id} at {self.viewed_at}"
+
+
+class TeacherStats(models.Model):
+    """Counters shown on the teacher dashboard, kept up to date by signals"""
+    teacher = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="dashboard_stats")
+    total_exams = models.IntegerField(default=0)
+    published_exams = models.IntegerField(default=0)
+    total_attempts = models.IntegerField(default=0)
+    pending_grading = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"TeacherStats for {self.teacher_id}"
+
+class ExamStats(models.Model):
+    """Per exam attempt counters by status, kept up to date by signals"""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total_attempts = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    submitted = models.IntegerField(default=0)
+    graded = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ExamStats for exam {self.exam_id}"
+
+class ExamSearchToken(models.Model):
+    """Inverted index entry: a normalized token of a published exam and its weight"""
+    token = models.CharField(max_length=64)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="search_tokens")
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        # Covers both lookups: top-N for one token and summing weights per exam
+        indexes = [models.Index(fields=["token", "-weight", "exam"])]
+
+    def __str__(self):
+        return f"{self.token} -> exam {self.exam_id}"
+
+class TopicFacet(models.Model):
+    """Number of published exams per topic, kept up to date by signals"""
+    topic = models.CharField(max_length=200, primary_key=True)
+    published_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ("topic",)
+
+    def __str__(self):
+        return f"{self.topic}: {self.published_count}"
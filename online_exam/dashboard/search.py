@@ -0,0 +1,220 @@
+# dashboard/search.py
+"""
+Exam search.
+
+Published exams are indexed into ExamSearchToken rows, one per distinct
+normalized token of an exam, weighted by the field it came from. A search
+reads its tokens from the covering (token, weight, exam) index and ranks
+exams by the summed weight, so the cost depends on how many exams contain
+the words instead of on the size of the exam table; a one-word search is a
+top-N read straight off the index.
+
+Text is normalized before tokenizing so the Arabic and Persian forms of yeh
+and kaf, diacritics, tatweel, Persian/Arabic digits and ZWNJ spelling
+variants all meet on the same token.
+"""
+import re
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ExamSearchToken, TopicFacet
+from questions.models import Exam
+from online_exam.pagination import DEFAULT_PER_PAGE, MAX_PER_PAGE, decode_cursor, keyset_page
+
+FIELD_WEIGHTS = (
+    ('title', 5),
+    ('topic', 3),
+    ('description', 1),
+)
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TOKENS = 8
+DEFAULT_LIMIT = 50
+# Ranks are summed integer weights; decodes the rank stored in a cursor
+RANK_FIELD = models.IntegerField()
+
+ZWNJ = '\u200c'
+
+CHARACTER_MAP = str.maketrans({
+    '\u064a': '\u06cc',  # Arabic yeh -> Persian yeh
+    '\u0649': '\u06cc',  # Alef maksura -> Persian yeh
+    '\u0643': '\u06a9',  # Arabic kaf -> Persian kaf
+    '\u0629': '\u0647',  # Teh marbuta -> heh
+    '\u0640': None,  # Tatweel
+    **{chr(0x06f0 + d): str(d) for d in range(10)},  # Persian digits
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic digits
+})
+
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+TOKEN = re.compile('\\w+(?:\u200c\\w+)*')
+
+
+def normalize(text):
+    text = DIACRITICS.sub('', (text or '').translate(CHARACTER_MAP))
+    # Other zero-width and direction marks are dropped, ZWNJ is kept for tokenize()
+    text = re.sub('[\u200b\u200d-\u200f\u202a-\u202e\ufeff]', '', text)
+    return text.casefold()
+
+
+def tokenize(text, split_compounds=False):
+    """
+    Split normalized text into tokens. Words written with a ZWNJ (e.g. می‌شود)
+    give their parts and the joined form, since people type all three; with
+    split_compounds only the parts are returned.
+    """
+    tokens = []
+    for word in TOKEN.findall(normalize(text)):
+        parts = word.split(ZWNJ)
+        if len(parts) > 1:
+            tokens.extend(parts)
+            if not split_compounds:
+                tokens.append(''.join(parts))
+        else:
+            tokens.append(word)
+    return [token[:MAX_TOKEN_LENGTH] for token in tokens if len(token) >= MIN_TOKEN_LENGTH]
+
+
+def exam_tokens(exam):
+    """Return {token: weight} for an exam"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in set(tokenize(getattr(exam, field))):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def build_tokens(exams):
+    return [
+        ExamSearchToken(exam_id=exam.pk, token=token, weight=weight)
+        for exam in exams
+        for token, weight in exam_tokens(exam).items()
+    ]
+
+
+def index_exam(exam):
+    """Replace the index rows of one exam; unpublished exams are not searchable"""
+    with transaction.atomic():
+        ExamSearchToken.objects.filter(exam_id=exam.pk).delete()
+        if exam.published:
+            ExamSearchToken.objects.bulk_create(build_tokens([exam]))
+
+
+def rebuild_index(batch_size=1000):
+    """Re-index every published exam; returns the number of indexed exams"""
+    indexed = 0
+    last_pk = 0
+    with transaction.atomic():
+        ExamSearchToken.objects.all().delete()
+        exams = Exam.objects.filter(published=True).order_by('pk').only('title', 'topic', 'description', 'published')
+        while True:
+            batch = list(exams.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            ExamSearchToken.objects.bulk_create(build_tokens(batch), batch_size=batch_size)
+            indexed += len(batch)
+    return indexed
+
+
+def ranked_matches(query, topic=None, after=None, backwards=False):
+    """
+    (exam_id, rank) rows of the published exams containing every word of the
+    query, best first. `after` is the (rank, exam_id) of the row to continue
+    after; backwards reads the rows before it, worst first.
+    """
+    terms = list(dict.fromkeys(tokenize(query, split_compounds=True)))[:MAX_QUERY_TOKENS]
+    if not terms:
+        return ExamSearchToken.objects.none().values_list('exam_id', 'weight')
+
+    matches = ExamSearchToken.objects.filter(token__in=terms)
+    if topic:
+        matches = matches.filter(exam__topic=topic)
+
+    if len(terms) == 1:
+        rank = 'weight'
+    else:
+        # An exam has one row per token, so matching all words means one row per word
+        rank = 'rank'
+        matches = matches.values('exam_id').annotate(
+            rank=Sum('weight'),
+            matched=Count('pk')
+        ).filter(matched=len(terms))
+
+    if after is not None:
+        value, exam_id = after
+        lookup = 'gt' if backwards else 'lt'
+        matches = matches.filter(Q(**{f'{rank}__{lookup}': value}) | Q(**{rank: value, f'exam_id__{lookup}': exam_id}))
+    ordering = (rank, 'exam_id') if backwards else (f'-{rank}', '-exam_id')
+    return matches.order_by(*ordering).values_list('exam_id', rank)
+
+
+def search_exam_ids(query, topic=None, limit=DEFAULT_LIMIT):
+    """Ids of the published exams containing every word of the query, best first"""
+    return [exam_id for exam_id, rank in ranked_matches(query, topic=topic)[:limit]]
+
+
+def _exams_in_order(exam_ids):
+    exams = Exam.objects.in_bulk(exam_ids)
+    return [exams[exam_id] for exam_id in exam_ids if exam_id in exams]
+
+
+def search_exams(query, topic=None, limit=DEFAULT_LIMIT):
+    """Matching published exams in rank order"""
+    return _exams_in_order(search_exam_ids(query, topic=topic, limit=limit))
+
+
+def paginate_search(query, topic=None, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    A KeysetPage of the matching exams in rank order. The cursor holds the
+    (rank, exam id) a page starts after, so deep pages are range reads on the
+    index like the first one.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    position = decode_cursor(cursor, RANK_FIELD)
+    after = position[:2] if position is not None else None
+    backwards = position is not None and position[2]
+
+    rows = list(ranked_matches(query, topic=topic, after=after, backwards=backwards)[:per_page + 1])
+    page = keyset_page(rows, per_page, position, lambda row: (row[1], row[0]))
+    page.object_list = _exams_in_order([exam_id for exam_id, rank in page.object_list])
+    return page
+
+
+def _facet_deltas(old_topic, old_published, new_topic, new_published):
+    deltas = {}
+    if old_published and old_topic:
+        deltas[old_topic] = -1
+    if new_published and new_topic:
+        deltas[new_topic] = deltas.get(new_topic, 0) + 1
+    return {topic: delta for topic, delta in deltas.items() if delta}
+
+
+def record_topic_change(old_topic, old_published, new_topic, new_published):
+    """Move an exam between topic facets; a missing facet row is recounted"""
+    for topic, delta in _facet_deltas(old_topic, old_published, new_topic, new_published).items():
+        if not TopicFacet.objects.filter(topic=topic).update(published_count=F('published_count') + delta):
+            count = Exam.objects.filter(published=True, topic=topic).count()
+            TopicFacet.objects.bulk_create(
+                [TopicFacet(topic=topic, published_count=count)],
+                update_conflicts=True, unique_fields=['topic'], update_fields=['published_count']
+            )
+
+
+def rebuild_topic_facets():
+    """Recount the published exams of every topic; returns the number of topics"""
+    counts = Exam.objects.filter(published=True).exclude(topic='').values('topic').annotate(
+        count=Count('id')
+    ).order_by()
+    with transaction.atomic():
+        TopicFacet.objects.all().delete()
+        facets = TopicFacet.objects.bulk_create(
+            [TopicFacet(topic=row['topic'], published_count=row['count']) for row in counts]
+        )
+    return len(facets)
+
+
+def get_topic_facets():
+    """Topics with at least one published exam, with their exam counts"""
+    return list(TopicFacet.objects.filter(published_count__gt=0))
@@ -0,0 +1,63 @@
+# dashboard/signals.py
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .search import index_exam, record_topic_change
+from .stats import record_attempt_transition, record_exam_change
+from attempts.signals import attempt_status_changed
+from questions.models import Exam
+
+
+@receiver(attempt_status_changed)
+def update_attempt_counters(sender, exam_id, old_status, new_status, count, **kwargs):
+    record_attempt_transition(exam_id, old_status, new_status, count)
+
+
+SEARCH_FIELDS = ('title', 'topic', 'description', 'published')
+FACET_FIELDS = {'topic', 'published'}
+
+
+def _search_fields(instance):
+    return tuple(instance.__dict__.get(field) for field in SEARCH_FIELDS)
+
+
+def _facet(instance):
+    """(topic, published), or None when either was deferred (.only()/.defer()) and isn't known"""
+    if FACET_FIELDS & instance.get_deferred_fields():
+        return None
+    return instance.topic, instance.published
+
+
+@receiver(post_init, sender=Exam)
+def remember_published(sender, instance, **kwargs):
+    instance._saved_facet = _facet(instance) if instance.pk else (None, None)
+    instance._saved_search_fields = _search_fields(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, created, **kwargs):
+    if created:
+        record_exam_change(instance.teacher_id, total_delta=1, published_delta=int(instance.published))
+
+    # Without both the loaded and the saved values the change is unknown; counters are left alone
+    old, new = instance._saved_facet, _facet(instance)
+    if old is not None and new is not None and old != new:
+        if not created and old[1] != new[1]:
+            record_exam_change(instance.teacher_id, published_delta=1 if new[1] else -1)
+        record_topic_change(*old, *new)
+    instance._saved_facet = new
+
+    # Only re-index when something searchable changed
+    search_fields = _search_fields(instance)
+    if search_fields != instance._saved_search_fields:
+        index_exam(instance)
+        instance._saved_search_fields = search_fields
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    # Deleting loads whole rows, so the facet is known unless the instance was deleted directly
+    old = instance._saved_facet
+    record_exam_change(instance.teacher_id, total_delta=-1, published_delta=-int(bool(old and old[1])))
+    if old is not None:
+        record_topic_change(*old, None, False)
@@ -0,0 +1,153 @@
+# dashboard/stats.py
+"""
+Denormalized dashboard counters.
+
+TeacherStats and ExamStats are adjusted with single UPDATE ... SET x = x + n
+statements whenever an attempt changes status or an exam is created,
+(un)published or deleted. A missing row is rebuilt from scratch on its
+first change, so the tables heal themselves; rebuild_dashboard_stats
+recomputes everything for consistency checks.
+"""
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import TeacherStats, ExamStats
+from attempts.models import Attempt
+from questions.models import Exam
+
+TEACHER_COUNTERS = ['total_exams', 'published_exams', 'total_attempts', 'pending_grading']
+EXAM_COUNTERS = ['total_attempts', 'in_progress', 'submitted', 'graded']
+
+# Counter columns affected when an attempt enters or leaves a status
+EXAM_STATUS_FIELDS = {
+    'in_progress': 'in_progress',
+    'submitted': 'submitted',
+    'graded': 'graded',
+}
+TEACHER_STATUS_FIELDS = {
+    'submitted': 'pending_grading',
+}
+
+
+def _deltas(old_status, new_status, status_fields, count):
+    deltas = {}
+    if old_status is None:
+        deltas['total_attempts'] = count
+    elif old_status in status_fields:
+        deltas[status_fields[old_status]] = -count
+    if new_status is None:
+        deltas['total_attempts'] = deltas.get('total_attempts', 0) - count
+    elif new_status in status_fields:
+        field = status_fields[new_status]
+        deltas[field] = deltas.get(field, 0) + count
+    return {field: delta for field, delta in deltas.items() if delta}
+
+
+def _apply(queryset, deltas):
+    """Add the deltas to the matching row; returns False if there is no row"""
+    if not deltas:
+        return True
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    return bool(queryset.update(updated_at=timezone.now(), **updates))
+
+
+def compute_teacher_stats(teacher_id):
+    return compute_all_teacher_stats([teacher_id])[0]
+
+
+def compute_exam_stats(exam_id):
+    return compute_all_exam_stats([exam_id])[0]
+
+
+def compute_all_teacher_stats(teacher_ids):
+    """Count exams and attempts of the given teachers with two grouped queries"""
+    exams = {
+        row['teacher_id']: row for row in Exam.objects.filter(teacher_id__in=teacher_ids).values('teacher_id').annotate(
+            total=Count('id'),
+            published=Count('id', filter=Q(published=True))
+        ).order_by()
+    }
+    attempts = {
+        row['exam__teacher_id']: row for row in Attempt.objects.filter(exam__teacher_id__in=teacher_ids).values('exam__teacher_id').annotate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='submitted'))
+        ).order_by()
+    }
+    rows = []
+    for teacher_id in teacher_ids:
+        exam_counts = exams.get(teacher_id, {})
+        attempt_counts = attempts.get(teacher_id, {})
+        rows.append(TeacherStats(
+            teacher_id=teacher_id,
+            total_exams=exam_counts.get('total', 0),
+            published_exams=exam_counts.get('published', 0),
+            total_attempts=attempt_counts.get('total', 0),
+            pending_grading=attempt_counts.get('pending', 0)
+        ))
+    return rows
+
+
+def compute_all_exam_stats(exam_ids):
+    """Count attempts by status for the given exams with one grouped query"""
+    counts = {
+        row['exam_id']: row for row in Attempt.objects.filter(exam_id__in=exam_ids).values('exam_id').annotate(
+            total=Count('id'),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+            submitted=Count('id', filter=Q(status='submitted')),
+            graded=Count('id', filter=Q(status='graded'))
+        ).order_by()
+    }
+    rows = []
+    for exam_id in exam_ids:
+        row = counts.get(exam_id, {})
+        rows.append(ExamStats(
+            exam_id=exam_id,
+            total_attempts=row.get('total', 0),
+            in_progress=row.get('in_progress', 0),
+            submitted=row.get('submitted', 0),
+            graded=row.get('graded', 0)
+        ))
+    return rows
+
+
+def save_teacher_stats(rows):
+    TeacherStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['teacher'], update_fields=TEACHER_COUNTERS + ['updated_at']
+    )
+
+
+def save_exam_stats(rows):
+    ExamStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['exam'], update_fields=EXAM_COUNTERS + ['updated_at']
+    )
+
+
+def record_attempt_transition(exam_id, old_status, new_status, count=1):
+    exam_deltas = _deltas(old_status, new_status, EXAM_STATUS_FIELDS, count)
+    if not _apply(ExamStats.objects.filter(exam_id=exam_id), exam_deltas):
+        save_exam_stats([compute_exam_stats(exam_id)])
+
+    teacher_deltas = _deltas(old_status, new_status, TEACHER_STATUS_FIELDS, count)
+    teacher_stats = TeacherStats.objects.filter(
+        teacher_id__in=Exam.objects.filter(pk=exam_id).values('teacher_id')
+    )
+    if not _apply(teacher_stats, teacher_deltas):
+        teacher_id = Exam.objects.filter(pk=exam_id).values_list('teacher_id', flat=True).first()
+        if teacher_id is not None:
+            save_teacher_stats([compute_teacher_stats(teacher_id)])
+
+
+def record_exam_change(teacher_id, total_delta=0, published_delta=0):
+    deltas = {'total_exams': total_delta, 'published_exams': published_delta}
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not _apply(TeacherStats.objects.filter(teacher_id=teacher_id), deltas):
+        save_teacher_stats([compute_teacher_stats(teacher_id)])
+
+
+def get_teacher_stats(teacher):
+    """Read the dashboard counters of a teacher by primary key"""
+    stats = TeacherStats.objects.filter(pk=teacher.pk).first()
+    if stats is None:
+        stats = compute_teacher_stats(teacher.pk)
+        save_teacher_stats([stats])
+    return stats
@@ -1,3 +1,188 @@
+# dashboard/tests.py
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attempts.models import Attempt, Answer
+from questions.models import Exam, Question
+from grading.autograde import grade_exam
+from .models import ExamSearchToken, TeacherStats, ExamStats, TopicFacet
+from .search import (
+    get_topic_facets, normalize, paginate_search, ranked_matches, rebuild_index, rebuild_topic_facets,
+    search_exams, tokenize,
+)
+
+
+class ExamTestCase(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pass', role='teacher')
+        self.student = User.objects.create_user('student', password='pass', role='student')
+        self.exam = self.create_exam(title='Exam', topic='math', published=True)
+
+    def create_exam(self, **kwargs):
+        kwargs.setdefault('title', 'Exam')
+        return Exam.objects.create(
+            teacher=self.teacher, start_at=timezone.now() - timedelta(minutes=5), duration_minutes=60, **kwargs
+        )
+
+
+class DashboardStatsTests(ExamTestCase):
+    def teacher_counters(self):
+        stats = TeacherStats.objects.get(teacher=self.teacher)
+        return (stats.total_exams, stats.published_exams, stats.total_attempts, stats.pending_grading)
+
+    def exam_counters(self):
+        stats = ExamStats.objects.get(exam=self.exam)
+        return (stats.total_attempts, stats.in_progress, stats.submitted, stats.graded)
+
+    def test_counters_follow_exams(self):
+        draft = self.create_exam(title='Draft')
+        self.assertEqual(self.teacher_counters()[:2], (2, 1))
+        draft.published = True
+        draft.save()
+        self.assertEqual(self.teacher_counters()[:2], (2, 2))
+        draft.delete()
+        self.assertEqual(self.teacher_counters()[:2], (1, 1))
+
+    def test_counters_follow_attempts(self):
+        question = Question.objects.create(exam=self.exam, text='q', qtype='short', order=1)
+        attempt = Attempt.objects.create(student=self.student, exam=self.exam)
+        Answer.objects.create(attempt=attempt, question=question, score=1)
+        self.assertEqual(self.exam_counters(), (1, 1, 0, 0))
+
+        attempt.submit()
+        self.assertEqual(self.exam_counters(), (1, 0, 1, 0))
+        self.assertEqual(self.teacher_counters()[2:], (1, 1))
+
+        grade_exam(self.exam)
+        self.assertEqual(self.exam_counters(), (1, 0, 0, 1))
+        self.assertEqual(self.teacher_counters()[2:], (1, 0))
+
+    def test_rebuild_repairs_drift(self):
+        Attempt.objects.create(student=self.student, exam=self.exam)
+        out = StringIO()
+        call_command('rebuild_dashboard_stats', '--check', stdout=out)
+        self.assertIn('0 stats rows out of sync', out.getvalue())
+
+        ExamStats.objects.filter(exam=self.exam).update(in_progress=5)
+        out = StringIO()
+        call_command('rebuild_dashboard_stats', '--check', stdout=out)
+        self.assertIn('1 stats rows out of sync', out.getvalue())
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        self.assertEqual(self.exam_counters(), (1, 1, 0, 0))
+
+    def test_teacher_home_reads_stored_counters(self):
+        for i in range(3):
+            Attempt.objects.create(student=User.objects.create_user(f's{i}'), exam=self.exam)
+        self.client.login(username='teacher', password='pass')
+        # Session, user, teacher stats and recent exams, whatever the number of attempts
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchTests(ExamTestCase):
+    def ids(self, exams):
+        return [exam.pk for exam in exams]
+
+    def test_normalization(self):
+        # Arabic kaf and yeh, diacritics and Persian digits
+        self.assertEqual(normalize('كيك'), 'کیک')
+        self.assertEqual(tokenize('ریاضیِ ۱۲'), ['ریاضی', '12'])
+        # ZWNJ compounds match both spellings
+        self.assertEqual(tokenize('می\u200cشود'), ['می', 'شود', 'میشود'])
+
+    def test_ranked_and_filtered_matches(self):
+        basic = self.create_exam(title='آزمون ریاضي پايه', topic='ریاضی', published=True)
+        applied = self.create_exam(title='فیزیک', description='ریاضی کاربردی', topic='فیزیک', published=True)
+        self.create_exam(title='ریاضی', published=False)
+        # Title matches outrank description matches
+        self.assertEqual(self.ids(search_exams('رياضی')), [basic.pk, applied.pk])
+        self.assertEqual(self.ids(search_exams('ریاضی پایه')), [basic.pk])
+        self.assertEqual(self.ids(search_exams('ریاضی', topic='فیزیک')), [applied.pk])
+
+    def test_index_follows_exam_changes(self):
+        exam = self.create_exam(title='هندسه پایه', published=False)
+        self.assertEqual(search_exams('هندسه'), [])
+        exam.published = True
+        exam.save()
+        self.assertEqual(self.ids(search_exams('هندسه')), [exam.pk])
+        exam.title = 'شیمی'
+        exam.save()
+        self.assertEqual(search_exams('هندسه'), [])
+        # Saving unchanged searchable fields leaves the index alone
+        with self.assertNumQueries(1):
+            exam.save()
+
+    def test_rebuild_index(self):
+        self.create_exam(title='آمار', published=True)
+        tokens = ExamSearchToken.objects.count()
+        ExamSearchToken.objects.all().delete()
+        self.assertEqual(rebuild_index(batch_size=1), 2)
+        self.assertEqual(ExamSearchToken.objects.count(), tokens)
+
+    def test_pages_follow_the_rank_order(self):
+        for i in range(20):
+            self.create_exam(title=f'جبر {i}', description='خطی' if i % 2 else '', published=True)
+        for query in ('جبر', 'جبر خطی'):
+            pages = [paginate_search(query, per_page=3)]
+            while pages[-1].has_next:
+                pages.append(paginate_search(query, cursor=pages[-1].next_cursor, per_page=3))
+            seen = [exam.pk for page in pages for exam in page]
+            self.assertEqual(seen, [exam_id for exam_id, rank in ranked_matches(query)])
+            self.assertEqual(len(seen), len(set(seen)))
+            back = paginate_search(query, cursor=pages[-1].previous_cursor, per_page=3)
+            self.assertEqual(self.ids(back), self.ids(pages[-2]))
+        self.assertEqual(len(seen), 10)
+
+    def test_search_view(self):
+        exam = self.create_exam(title='ریاضی گسسته', published=True)
+        self.client.login(username='student', password='pass')
+        response = self.client.get(reverse('dashboard:search'), {'q': 'ریاضي'})
+        self.assertContains(response, exam.title)
+
+
+class TopicFacetTests(ExamTestCase):
+    def facets(self):
+        return {facet.topic: facet.published_count for facet in get_topic_facets()}
+
+    def test_counts_follow_publishing_and_topic_changes(self):
+        self.assertEqual(self.facets(), {'math': 1})
+        exam = self.create_exam(topic='physics')
+        self.assertEqual(self.facets(), {'math': 1})
+        exam.published = True
+        exam.save()
+        self.assertEqual(self.facets(), {'math': 1, 'physics': 1})
+        exam.topic = 'math'
+        exam.save()
+        self.assertEqual(self.facets(), {'math': 2})
+        Exam.objects.get(pk=exam.pk).delete()
+        self.assertEqual(self.facets(), {'math': 1})
+
+    def test_missing_row_is_recounted(self):
+        TopicFacet.objects.all().delete()
+        self.create_exam(topic='math', published=True)
+        self.assertEqual(self.facets(), {'math': 2})
+        TopicFacet.objects.all().delete()
+        self.assertEqual(rebuild_topic_facets(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.facets(), {'math': 2})
+
+    def test_deferred_fields_leave_counts_alone(self):
+        exam = Exam.objects.only('title').get(pk=self.exam.pk)
+        # No query to load the deferred facet fields
+        with self.assertNumQueries(1):
+            exam.save(update_fields=['title'])
+        exam = Exam.objects.only('title', 'teacher').get(pk=self.exam.pk)
+        exam.topic = 'physics'
+        exam.save()
+        self.assertEqual(self.facets(), {'math': 1})
 
-# Create your tests here.
+    def test_search_page_lists_facets(self):
+        self.client.login(username='student', password='pass')
+        self.assertContains(self.client.get(reverse('dashboard:search')), 'math (1)')
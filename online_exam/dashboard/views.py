@@ -6,8 +6,12 @@ from django.views import View
 from django.utils import timezone
 from django.db.models import Count, Avg
 
+from .search import get_topic_facets, paginate_search
+from .stats import get_teacher_stats
 from questions.models import Exam
 from attempts.models import Attempt
+from attempts.availability import get_available_exams
+from online_exam.pagination import CURSOR_PARAM, paginate_request
 
 
 @method_decorator(login_required, name='dispatch')
@@ -18,27 +22,18 @@ class HomeView(View):
 
         if user.is_teacher():
             # Teacher dashboard
-            exams = Exam.objects.filter(teacher=user)
-            context['exams'] = exams
-            context['total_exams'] = exams.count()
-            context['published_exams'] = exams.filter(published=True).count()
-            context['total_attempts'] = Attempt.objects.filter(exam__teacher=user).count()
-            context['pending_grading'] = Attempt.objects.filter(
-                exam__teacher=user,
-                status='submitted'
-            ).count()
+            stats = get_teacher_stats(user)
+            context['exams'] = Exam.objects.filter(teacher=user)[:5]
+            context['total_exams'] = stats.total_exams
+            context['published_exams'] = stats.published_exams
+            context['total_attempts'] = stats.total_attempts
+            context['pending_grading'] = stats.pending_grading
             return render(request, 'dashboard/teacher_home.html', context)
 
         else:
             # Student dashboard
-            now = timezone.now()
-            
             # Available exams (published and not yet taken)
-            taken_exam_ids = Attempt.objects.filter(student=user).values_list('exam_id', flat=True)
-            available_exams = Exam.objects.filter(
-                published=True,
-                start_at__lte=now
-            ).exclude(id__in=taken_exam_ids)
+            available_exams = get_available_exams(user)
             
             # My attempts
             my_attempts = Attempt.objects.filter(student=user).select_related('exam')
@@ -60,17 +55,21 @@ class SearchExamsView(View):
         topic = request.GET.get('topic', '')
         
         exams = Exam.objects.filter(published=True)
-        
-        if query:
-            exams = exams.filter(title__icontains=query)
         if topic:
-            exams = exams.filter(topic__icontains=topic)
-        
-        # Get unique topics for filter
-        topics = Exam.objects.filter(published=True).values_list('topic', flat=True).distinct()
+            exams = exams.filter(topic=topic)
+
+        if query:
+            # Ranked results from the search index
+            page = paginate_search(query, topic=topic, cursor=request.GET.get(CURSOR_PARAM))
+        else:
+            page = paginate_request(request, exams, '-start_at')
         
+        # Topic filter with the number of published exams of each topic
+        topics = get_topic_facets()
+
         context = {
-            'exams': exams,
+            'exams': page,
+            'page': page,
             'query': query,
             'topic': topic,
             'topics': topics,
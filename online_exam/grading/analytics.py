@@ -0,0 +1,150 @@
+# grading/analytics.py
+"""
+Item analysis of an exam.
+
+For every question of an exam, over its graded attempts:
+
+- difficulty: mean score / max score (1.0 means everyone got full marks)
+- discrimination: mean score of the top 27% of students minus the mean
+  score of the bottom 27% (ranked by total score), divided by max score
+- a histogram of the scores and, for multiple choice questions, how often
+  each choice was picked
+
+Everything is computed by a handful of grouped queries, so no answer rows
+are loaded into Python. The result is a plain dict cached per exam; it is
+dropped whenever an attempt of the exam enters or leaves the graded state
+or a graded attempt is re-graded, and rebuilt on the next read.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from attempts.models import Attempt, Answer
+from questions.models import Question, Choice
+
+GROUP_FRACTION = 0.27
+QUESTION_HISTOGRAM_BINS = 5
+TOTAL_HISTOGRAM_BINS = 10
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _cache_key(exam_id):
+    return f'grading:item-analysis:{exam_id}'
+
+
+def invalidate_item_analysis(exam_id):
+    # After commit, so a concurrent read can't cache the old data again
+    transaction.on_commit(lambda: cache.delete(_cache_key(exam_id)))
+
+
+def histogram(counts, upper, bins):
+    """
+    Bucket {value: count} into `bins` equal-width bins over [0, upper].
+    Returns a list of {'low', 'high', 'count'}.
+    """
+    width = upper / bins if upper else 1
+    buckets = [0] * bins
+    for value, count in counts.items():
+        index = int(value / width) if value > 0 else 0
+        buckets[min(index, bins - 1)] += count
+    return [
+        {'low': round(i * width, 2), 'high': round((i + 1) * width, 2), 'count': buckets[i]}
+        for i in range(bins)
+    ]
+
+
+def group_thresholds(totals):
+    """
+    Total score limits of the upper and lower 27% groups, as (upper, lower).
+    Students tied with the last member of a group belong to it as well.
+    """
+    if len(totals) < 2:
+        return None, None
+    ranked = sorted(totals)
+    size = max(1, round(len(ranked) * GROUP_FRACTION))
+    return ranked[-size], ranked[size - 1]
+
+
+def compute_item_analysis(exam):
+    graded = Attempt.objects.filter(exam=exam, status='graded')
+    totals = [total or 0 for total in graded.values_list('total_score', flat=True)]
+    upper, lower = group_thresholds(totals)
+
+    answers = Answer.objects.filter(attempt__exam=exam, attempt__status='graded')
+    aggregates = {'answered': Count('pk', filter=Q(score__isnull=False)), 'mean': Avg('score')}
+    if upper is not None:
+        aggregates['upper_mean'] = Avg('score', filter=Q(attempt__total_score__gte=upper))
+        aggregates['lower_mean'] = Avg('score', filter=Q(attempt__total_score__lte=lower))
+    stats = {row['question_id']: row for row in answers.values('question_id').annotate(**aggregates).order_by()}
+
+    score_counts = {}
+    for row in answers.filter(score__isnull=False).values('question_id', 'score').annotate(count=Count('pk')).order_by():
+        score_counts.setdefault(row['question_id'], {})[row['score']] = row['count']
+
+    choice_counts = {}
+    for row in answers.filter(question__qtype=Question.TYPE_MCQ).values('question_id', 'selected_choice_id').annotate(count=Count('pk')).order_by():
+        choice_counts.setdefault(row['question_id'], {})[row['selected_choice_id']] = row['count']
+
+    choices = {}
+    for choice in Choice.objects.filter(question__exam=exam).order_by('id').values('id', 'question_id', 'text', 'is_correct'):
+        choices.setdefault(choice['question_id'], []).append(choice)
+
+    questions = []
+    for question in Question.objects.filter(exam=exam).order_by('order', 'id'):
+        row = stats.get(question.id, {})
+        max_score = question.max_score or 0
+        mean = row.get('mean')
+        item = {
+            'id': question.id,
+            'order': question.order,
+            'text': question.text,
+            'qtype': question.qtype,
+            'max_score': max_score,
+            'answered': row.get('answered', 0),
+            'mean': mean,
+            'difficulty': mean / max_score if mean is not None and max_score else None,
+            'discrimination': None,
+            'histogram': histogram(score_counts.get(question.id, {}), max_score, QUESTION_HISTOGRAM_BINS),
+            'choices': None,
+        }
+        if row.get('upper_mean') is not None and row.get('lower_mean') is not None and max_score:
+            item['discrimination'] = (row['upper_mean'] - row['lower_mean']) / max_score
+        if question.qtype == Question.TYPE_MCQ:
+            counts = choice_counts.get(question.id, {})
+            picked = sum(counts.values())
+            item['choices'] = [
+                {
+                    'id': choice['id'],
+                    'text': choice['text'],
+                    'is_correct': choice['is_correct'],
+                    'count': counts.get(choice['id'], 0),
+                    'share': counts.get(choice['id'], 0) / picked if picked else 0,
+                }
+                for choice in choices.get(question.id, [])
+            ]
+            item['unanswered'] = counts.get(None, 0)
+        questions.append(item)
+
+    total_counts = {}
+    for total in totals:
+        total_counts[total] = total_counts.get(total, 0) + 1
+
+    return {
+        'attempts': len(totals),
+        'mean_total': sum(totals) / len(totals) if totals else None,
+        'upper_threshold': upper,
+        'lower_threshold': lower,
+        'total_histogram': histogram(total_counts, exam.total_score, TOTAL_HISTOGRAM_BINS),
+        'questions': questions,
+        'computed_at': timezone.now(),
+    }
+
+
+def get_item_analysis(exam):
+    key = _cache_key(exam.pk)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = compute_item_analysis(exam)
+        cache.set(key, analysis, CACHE_TIMEOUT)
+    return analysis
@@ -0,0 +1,89 @@
+# grading/archive.py
+"""
+ZIP archive of the uploaded answer files of an exam.
+
+The archive is written by zipfile into a buffer that is emptied after every
+write, and each write is yielded to the response at once; zipfile sees a
+non-seekable stream and writes data descriptors instead of seeking back.
+Answers come from one ordered query through iterator() and each file is
+copied chunk by chunk, so neither a temporary file nor the whole archive is
+ever held: memory stays around one chunk whatever the exam size. Entries are
+stored, not deflated; scans, PDFs and images hardly compress and deflating
+them would only cost CPU.
+"""
+import zipfile
+
+from django.utils import timezone
+
+from attempts.models import Answer
+from questions.models import Question
+
+DEFAULT_CHUNK_SIZE = 2000
+ARCHIVE_STATUSES = ['submitted', 'graded']
+
+
+class ZipStream:
+    """Write-only file object that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def archive_entries(exam, question=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield (entry name, answer) for every uploaded file of the exam, or of one
+    question. Entries are named username/qNNN_filename, NNN being the
+    question's position in the exam.
+    """
+    questions = Question.objects.filter(exam=exam).order_by('order', 'id').values_list('id', flat=True)
+    positions = {question_id: i for i, question_id in enumerate(questions, start=1)}
+
+    answers = Answer.objects.filter(
+        attempt__exam=exam,
+        attempt__status__in=ARCHIVE_STATUSES
+    ).exclude(uploaded_file='').exclude(uploaded_file__isnull=True)
+    if question is not None:
+        answers = answers.filter(question=question)
+    answers = answers.select_related('attempt__student').only(
+        'uploaded_file', 'question_id', 'attempt__submitted_at', 'attempt__student__username'
+    ).order_by('attempt__student__username', 'question__order', 'question_id')
+
+    for answer in answers.iterator(chunk_size=chunk_size):
+        name = f'{answer.attempt.student.username}/q{positions.get(answer.question_id, 0):03d}_{answer.file_name}'
+        yield name, answer
+
+
+def stream_answer_files_zip(exam, question=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the bytes of a ZIP archive with the uploaded files of an exam"""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, answer in archive_entries(exam, question=question, chunk_size=chunk_size):
+            try:
+                source = answer.uploaded_file.open('rb')
+            except FileNotFoundError:
+                continue
+            with source:
+                submitted_at = timezone.localtime(answer.attempt.submitted_at or timezone.now())
+                info = zipfile.ZipInfo(name, date_time=submitted_at.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                # Known up front, so zipfile picks ZIP64 for files over 4GB
+                info.file_size = source.size
+                with archive.open(info, 'w') as entry:
+                    for chunk in source.chunks():
+                        entry.write(chunk)
+                        yield stream.take()
+            yield stream.take()
+    # The central directory
+    yield stream.take()
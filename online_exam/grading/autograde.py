@@ -0,0 +1,183 @@
+# grading/autograde.py
+"""
+Batch auto-grading.
+
+Everything an answer needs for grading (question, regex, correct choices) is
+loaded once per exam, answers are read in primary-key chunks and scores are
+written back with one UPDATE per distinct grade, logs with one bulk_create
+per chunk. Regex
+matches run through the RegexSandbox so one bad pattern can only time out
+its own answers.
+"""
+import re
+import time
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import AutoGraderLog
+from .regex_sandbox import RegexSandbox, compile_pattern
+from attempts.models import Attempt, Answer
+from attempts.signals import send_status_changed
+from questions.models import Question, Choice
+
+DEFAULT_CHUNK_SIZE = 500
+
+GRADED_FIELDS = ['score', 'is_auto_graded', 'graded_at', 'needs_manual']
+
+
+class AutoGrader:
+    """Grades the answers of one exam in memory"""
+
+    def __init__(self, exam_id, sandbox):
+        self.sandbox = sandbox
+        self.questions = {q.id: q for q in Question.objects.filter(exam_id=exam_id)}
+        self.correct_choices = set(
+            Choice.objects.filter(question__exam_id=exam_id, is_correct=True).values_list('id', flat=True)
+        )
+
+        # Compile each regex once; None marks an invalid pattern
+        self.patterns = {}
+        for question in self.questions.values():
+            if question.qtype == Question.TYPE_SHORT and question.auto_grade_regex:
+                try:
+                    self.patterns[question.id] = compile_pattern(question.auto_grade_regex)
+                except re.error:
+                    self.patterns[question.id] = None
+
+    def _award(self, answer, matched, reason, now):
+        answer.score = self.questions[answer.question_id].max_score if matched else 0
+        answer.is_auto_graded = True
+        answer.graded_at = now
+        return AutoGraderLog(
+            answer=answer,
+            matched=matched,
+            awarded_score=answer.score,
+            reason=reason
+        )
+
+    def grade_chunk(self, answers, now):
+        """
+        Grade a chunk of answers without touching the database.
+        Returns the AutoGraderLog rows to store; answers that could not be
+        graded automatically are flagged with needs_manual.
+        """
+        logs = []
+        regex_answers = defaultdict(list)
+
+        for answer in answers:
+            question = self.questions[answer.question_id]
+            if question.qtype == Question.TYPE_MCQ:
+                matched = answer.selected_choice_id in self.correct_choices
+                logs.append(self._award(answer, matched, 'چندگزینه‌ای - تصحیح خودکار', now))
+            elif question.qtype == Question.TYPE_SHORT and self.patterns.get(question.id):
+                regex_answers[question.id].append(answer)
+            else:
+                # File answers, missing or invalid regex
+                answer.needs_manual = True
+
+        # Match all answers of a question in one sandbox round trip
+        for question_id, group in regex_answers.items():
+            pattern = self.patterns[question_id]
+            results = self.sandbox.fullmatch_many(pattern, [(a.text_answer or '').strip() for a in group])
+            for answer, matched in zip(group, results):
+                if matched is None:
+                    answer.needs_manual = True
+                    logs.append(AutoGraderLog(
+                        answer=answer,
+                        matched=False,
+                        needs_manual=True,
+                        reason=f'پایان مهلت تطبیق با الگو: {pattern.pattern}'
+                    ))
+                else:
+                    logs.append(self._award(answer, matched, f'تطبیق با الگو: {pattern.pattern}', now))
+
+        return logs
+
+
+def finalize_attempts(attempts):
+    """Set total_score and mark as graded the attempts whose answers all have a score"""
+    finished = list(
+        attempts.annotate(
+            ungraded=Count('answers', filter=Q(answers__score__isnull=True)),
+            score_sum=Sum('answers__score')
+        ).filter(ungraded=0)
+    )
+    transitions = Counter()
+    for attempt in finished:
+        transitions[(attempt.exam_id, attempt.status)] += 1
+        attempt.total_score = attempt.score_sum or 0
+        attempt.status = 'graded'
+    Attempt.objects.bulk_update(finished, ['total_score', 'status'], batch_size=DEFAULT_CHUNK_SIZE)
+
+    # bulk_update skips post_save, so report the status changes explicitly
+    for (exam_id, old_status), count in transitions.items():
+        send_status_changed(exam_id, old_status, 'graded', count)
+    return finished
+
+
+def save_grades(answers):
+    """
+    Write the grades of a chunk with one UPDATE per distinct grade. Scores are
+    a question's max_score or 0 and graded_at is shared by the chunk, so a
+    chunk has a handful of distinct grades instead of one per row.
+    """
+    groups = defaultdict(list)
+    for answer in answers:
+        groups[tuple(getattr(answer, field) for field in GRADED_FIELDS)].append(answer.pk)
+    for values, ids in groups.items():
+        Answer.objects.filter(pk__in=ids).update(**dict(zip(GRADED_FIELDS, values)))
+
+
+def grade_attempts(exam_id, attempts, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """
+    Auto grade every not yet scored answer of the given attempts (all of one exam).
+    on_chunk, if given, is called after every chunk written.
+    Returns a dict of counters including the throughput in answers per second.
+    """
+    started = time.monotonic()
+    # Answers already left for manual grading (files, bad or timed-out regexes) are not retried
+    pending = Answer.objects.filter(attempt__in=attempts, score__isnull=True, needs_manual=False).order_by('pk')
+
+    auto_graded = 0
+    manual = 0
+    last_pk = 0
+    with RegexSandbox() as sandbox:
+        grader = AutoGrader(exam_id, sandbox)
+        while True:
+            chunk = list(pending.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            logs = grader.grade_chunk(chunk, timezone.now())
+            graded = sum(1 for answer in chunk if answer.score is not None)
+            auto_graded += graded
+            manual += len(chunk) - graded
+
+            with transaction.atomic():
+                save_grades(chunk)
+                AutoGraderLog.objects.bulk_create(logs)
+            if on_chunk is not None:
+                on_chunk()
+
+    finished = finalize_attempts(attempts)
+
+    elapsed = time.monotonic() - started
+    total = auto_graded + manual
+    return {
+        'answers': total,
+        'auto_graded': auto_graded,
+        'manual': manual,
+        'attempts_graded': len(finished),
+        'elapsed': elapsed,
+        'rate': total / elapsed if elapsed else 0.0,
+    }
+
+
+def grade_exam(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Auto grade all submitted attempts of an exam"""
+    attempts = Attempt.objects.filter(exam=exam, status='submitted')
+    return grade_attempts(exam.pk, attempts, chunk_size=chunk_size)
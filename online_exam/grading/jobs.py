@@ -0,0 +1,165 @@
+# grading/jobs.py
+"""
+Background grading jobs.
+
+A GradingJob row queues an exam for auto-grading. The run_grading_jobs
+command claims queued jobs, splits the exam's pending attempts into
+partitions and grades them on a process pool, each worker with its own
+database connection. Progress is stored on the job after every partition
+and a heartbeat at most every HEARTBEAT_INTERVAL seconds while one is
+graded; since only attempts with unprocessed answers are picked up, a job
+interrupted by a crash simply continues where it stopped.
+
+Workers are separate processes, and the runner itself is not a web process.
+The ranking and item analysis invalidations they send only reach the web
+processes through a shared cache backend (Redis, Memcached, database); with
+LocMemCache the web processes keep serving cached data until it expires.
+The runner invalidates both again itself once a pool has finished. SQLite
+takes one writer at a time, so the runner uses a single worker there
+unless told otherwise.
+"""
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.db import connection, connections
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .analytics import invalidate_item_analysis
+from .autograde import finalize_attempts, grade_attempts
+from .models import GradingJob
+from .ranking import invalidate_ranking
+from attempts.models import Attempt, Answer
+
+DEFAULT_WORKERS = 4
+DEFAULT_PARTITION_SIZE = 200
+DEFAULT_STALE_AFTER = timedelta(minutes=5)
+# At most one heartbeat write per job and process in this many seconds
+HEARTBEAT_INTERVAL = 30
+
+# Backends that take one writer at a time; parallel workers only queue on the lock there
+SINGLE_WRITER_VENDORS = {'sqlite'}
+
+
+def default_workers():
+    return 1 if connection.vendor in SINGLE_WRITER_VENDORS else DEFAULT_WORKERS
+
+
+def enqueue_exam_grading(exam, requested_by=None):
+    """Queue an exam for background grading, reusing an already active job"""
+    job = GradingJob.objects.filter(exam=exam, status__in=['pending', 'running']).first()
+    if job is None:
+        job = GradingJob.objects.create(exam=exam, requested_by=requested_by)
+    return job
+
+
+def pending_attempts(exam_id):
+    """Submitted attempts that still have answers the auto grader has not looked at"""
+    unprocessed = Answer.objects.filter(
+        attempt=OuterRef('pk'),
+        score__isnull=True,
+        needs_manual=False
+    )
+    return Attempt.objects.filter(exam_id=exam_id, status='submitted').filter(Exists(unprocessed))
+
+
+def claim_jobs(stale_after=DEFAULT_STALE_AFTER):
+    """
+    Yield jobs this runner now owns: queued jobs, and running jobs whose
+    runner stopped sending heartbeats (it crashed or was killed).
+    """
+    now = timezone.now()
+    candidates = GradingJob.objects.filter(status='pending') | GradingJob.objects.filter(
+        status='running', heartbeat_at__lt=now - stale_after
+    )
+    for job in candidates.order_by('created_at'):
+        claimed = GradingJob.objects.filter(
+            pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at
+        ).update(status='running', heartbeat_at=now, started_at=job.started_at or now)
+        if claimed:
+            job.refresh_from_db()
+            yield job
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # Spawned (not forked) workers start without Django configured
+        django.setup()
+    connections.close_all()
+
+
+class Heartbeat:
+    """Marks a job as alive while a partition is graded, so it isn't claimed as stale"""
+
+    def __init__(self, job_id, interval=HEARTBEAT_INTERVAL):
+        self.job_id = job_id
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def __call__(self):
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            GradingJob.objects.filter(pk=self.job_id).update(heartbeat_at=timezone.now())
+            self.last = now
+
+
+def _grade_partition(job_id, exam_id, attempt_ids):
+    result = grade_attempts(exam_id, Attempt.objects.filter(pk__in=attempt_ids), on_chunk=Heartbeat(job_id))
+    GradingJob.objects.filter(pk=job_id).update(
+        processed_attempts=F('processed_attempts') + len(attempt_ids),
+        heartbeat_at=timezone.now()
+    )
+    return result
+
+
+def run_job(job, workers=None, partition_size=DEFAULT_PARTITION_SIZE):
+    """
+    Grade all pending attempts of a claimed job and return the summed counters.
+    workers defaults to 1 on SQLite and DEFAULT_WORKERS elsewhere.
+    """
+    if workers is None:
+        workers = default_workers()
+    attempt_ids = list(pending_attempts(job.exam_id).order_by('pk').values_list('pk', flat=True))
+
+    # On resume the original total is kept and already graded attempts count as processed
+    if not job.total_attempts:
+        job.total_attempts = len(attempt_ids)
+    job.processed_attempts = max(0, job.total_attempts - len(attempt_ids))
+    job.save(update_fields=['total_attempts', 'processed_attempts'])
+
+    partitions = [attempt_ids[i:i + partition_size] for i in range(0, len(attempt_ids), partition_size)]
+    totals = {'answers': 0, 'auto_graded': 0, 'manual': 0, 'attempts_graded': 0}
+
+    try:
+        if workers <= 1 or len(partitions) <= 1:
+            results = (_grade_partition(job.pk, job.exam_id, ids) for ids in partitions)
+            for result in results:
+                for key in totals:
+                    totals[key] += result[key]
+        else:
+            # Forked workers must not share the parent's open connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_grade_partition, job.pk, job.exam_id, ids) for ids in partitions]
+                for future in as_completed(futures):
+                    result = future.result()
+                    for key in totals:
+                        totals[key] += result[key]
+            # The workers' invalidations only reached their own local cache, if that is what it is
+            invalidate_item_analysis(job.exam_id)
+            invalidate_ranking(job.exam_id)
+    except Exception:
+        GradingJob.objects.filter(pk=job.pk).update(
+            status='failed', error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        raise
+
+    # Attempts finished by hand since their last auto grading pass are closed too
+    totals['attempts_graded'] += len(finalize_attempts(Attempt.objects.filter(exam_id=job.exam_id, status='submitted')))
+
+    GradingJob.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now())
+    return totals
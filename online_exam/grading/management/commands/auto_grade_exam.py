@@ -0,0 +1,31 @@
+# grading/management/commands/auto_grade_exam.py
+from django.core.management.base import BaseCommand, CommandError
+
+from grading.autograde import DEFAULT_CHUNK_SIZE, grade_exam
+from questions.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Auto grades all submitted attempts of an exam in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Number of answers loaded and written per batch')
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options['exam_id'])
+        except Exam.DoesNotExist:
+            raise CommandError(f'Exam {options["exam_id"]} does not exist')
+
+        self.stdout.write(f'Auto grading "{exam.title}"...')
+        result = grade_exam(exam, chunk_size=options['chunk_size'])
+
+        self.stdout.write(f'  Answers processed: {result["answers"]}')
+        self.stdout.write(f'  Auto graded: {result["auto_graded"]}')
+        self.stdout.write(f'  Need manual grading: {result["manual"]}')
+        self.stdout.write(f'  Attempts graded: {result["attempts_graded"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {result["elapsed"]:.2f}s ({result["rate"]:.0f} answers/sec)'
+        ))
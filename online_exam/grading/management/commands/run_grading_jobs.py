@@ -0,0 +1,49 @@
+# grading/management/commands/run_grading_jobs.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from grading.jobs import (
+    DEFAULT_PARTITION_SIZE, DEFAULT_STALE_AFTER, DEFAULT_WORKERS, claim_jobs, run_job,
+)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued exam grading jobs on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help=f'Number of grading processes (default: 1 on SQLite, {DEFAULT_WORKERS} otherwise)')
+        parser.add_argument('--partition-size', type=int, default=DEFAULT_PARTITION_SIZE,
+                            help='Number of attempts graded by one worker task')
+        parser.add_argument('--stale-after', type=int, default=int(DEFAULT_STALE_AFTER.total_seconds()),
+                            help='Seconds without progress after which a running job is resumed')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+
+        while True:
+            for job in claim_jobs(stale_after=stale_after):
+                self.stdout.write(f'Running grading job {job.pk} for "{job.exam.title}"...')
+                started = time.monotonic()
+                try:
+                    totals = run_job(job, workers=options['workers'], partition_size=options['partition_size'])
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'  Job {job.pk} failed: {e}'))
+                    continue
+                elapsed = time.monotonic() - started
+                rate = totals['answers'] / elapsed if elapsed else 0.0
+                self.stdout.write(self.style.SUCCESS(
+                    f'  {totals["answers"]} answers, {totals["auto_graded"]} auto graded, '
+                    f'{totals["manual"]} manual, {totals["attempts_graded"]} attempts graded '
+                    f'in {elapsed:.2f}s ({rate:.0f} answers/sec)'
+                ))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
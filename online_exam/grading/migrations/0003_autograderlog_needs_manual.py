@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grading', '0002_gradingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='autograderlog',
+            name='needs_manual',
+            field=models.BooleanField(default=False),
+        ),
+    ]
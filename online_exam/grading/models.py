@@ -4,6 +4,7 @@ from django.conf import settings
 from django.utils import timezone
 
 from attempts.models import Answer, Attempt
+from questions.models import Exam
 
 class ManualReview(models.Model):
     answer = models.OneToOneField(Answer, on_delete=models.CASCADE, related_name="manual_review")
@@ -35,8 +36,41 @@ class AutoGraderLog(models.Model):
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name="autograde_logs")
     matched = models.BooleanField()
     awarded_score = models.FloatField(blank=True, null=True)
+    needs_manual = models.BooleanField(default=False)
     reason = models.TextField(blank=True)
     run_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"AutogradeLog {self.pk} for Answer {self.answer_id}"
+
+class GradingJob(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "در صف"),
+        ("running", "در حال تصحیح"),
+        ("done", "انجام شده"),
+        ("failed", "ناموفق"),
+    )
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="grading_jobs")
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="grading_jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total_attempts = models.PositiveIntegerField(default=0)
+    processed_attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    @property
+    def progress(self):
+        if not self.total_attempts:
+            return 0
+        return min(100, int(self.processed_attempts * 100 / self.total_attempts))
+
+    def __str__(self):
+        return f"GradingJob {self.pk} for {self.exam} ({self.status})"
@@ -0,0 +1,94 @@
+# grading/ranking.py
+"""
+Exam rankings.
+
+The total scores of an exam's graded attempts are materialized once as a
+sorted array; rank, percentile and top-N questions are then answered with
+bisect instead of a COUNT or window-function query per page view. The array
+is shared through the cache under a version number, and each process also
+keeps the arrays of its LOCAL_RANKINGS most recently used exams, so a
+lookup only reads the small version entry. When an attempt enters or leaves
+the graded state, or graded scores change, the version is bumped and the
+next lookup rebuilds the array.
+"""
+from bisect import bisect_left, bisect_right
+
+from django.db import transaction
+from django.db.models import F
+
+from attempts.models import Attempt
+from online_exam.versioned_cache import VersionedCache
+
+RANKING_CACHE_TIMEOUT = 60 * 60 * 24
+LEADERBOARD_SIZE = 100
+
+# Rankings this process has loaded, kept for the most recently used exams
+LOCAL_RANKINGS = 64
+
+rankings = VersionedCache('exam_ranking', RANKING_CACHE_TIMEOUT, local_size=LOCAL_RANKINGS)
+
+
+def get_ranking_version(exam_id):
+    return rankings.version(exam_id)
+
+
+def invalidate_ranking(exam_id):
+    """Rebuild the ranking of an exam on its next use, once the current transaction commits"""
+    transaction.on_commit(lambda: rankings.bump(exam_id))
+
+
+class Ranking:
+    """Sorted total scores of an exam plus its leaderboard"""
+
+    def __init__(self, scores, leaders):
+        self.scores = scores    # ascending
+        self.leaders = leaders  # best first: (attempt_id, student name, score)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def rank(self, score):
+        """1 + number of strictly better scores; tied students share a rank"""
+        return len(self.scores) - bisect_right(self.scores, score) + 1
+
+    def percentile(self, score):
+        """Percentage of students scoring below, counting ties as half"""
+        if not self.scores:
+            return None
+        below = bisect_left(self.scores, score)
+        tied = bisect_right(self.scores, score) - below
+        return 100.0 * (below + tied / 2) / len(self.scores)
+
+    def top(self, n=10):
+        return [
+            {'rank': self.rank(score), 'attempt_id': attempt_id, 'student': student, 'score': score}
+            for attempt_id, student, score in self.leaders[:n]
+        ]
+
+    def position(self, score):
+        return {
+            'rank': self.rank(score),
+            'percentile': self.percentile(score),
+            'total': len(self.scores),
+        }
+
+
+def build_ranking(exam_id):
+    rows = Attempt.objects.filter(exam_id=exam_id, status='graded').order_by(
+        F('total_score').desc(nulls_last=True), 'submitted_at', 'pk'
+    ).values_list(
+        'pk', 'student__username', 'student__first_name', 'student__last_name', 'total_score'
+    )
+    scores = []
+    leaders = []
+    for attempt_id, username, first_name, last_name, total in rows.iterator(chunk_size=2000):
+        total = total or 0
+        scores.append(total)
+        if len(leaders) < LEADERBOARD_SIZE:
+            leaders.append((attempt_id, f'{first_name} {last_name}'.strip() or username, total))
+    scores.reverse()
+    return Ranking(scores, leaders)
+
+
+def get_ranking(exam_id):
+    return rankings.get(exam_id, build_ranking)[1]
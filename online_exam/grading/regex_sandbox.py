@@ -0,0 +1,176 @@
+# grading/regex_sandbox.py
+"""
+Time-limited matching of teacher supplied auto_grade_regex patterns.
+
+Python's re engine backtracks, so a pattern like ``(a+)+$`` can run for
+hours on a long student answer. Patterns that can't backtrack that way
+(literals, and patterns with a single repeat and no alternation or
+backreference under it, like ``^\\d+$``) are matched in-process. The others
+are matched in a helper process that reports one result per answer; when a
+single match takes longer than its budget the helper is killed, the answer
+is reported as timed out, and a fresh helper continues with the rest.
+"""
+import multiprocessing
+import re
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from django.conf import settings
+
+DEFAULT_MATCH_TIMEOUT = 0.5
+# Time a helper process gets to start, apart from the per-match budget
+STARTUP_TIMEOUT = 30
+
+# Inputs that make a backtracking pattern blow up: a long run of characters
+# the pattern keeps matching, then one it can't
+PROBE_TEXTS = [run * 40 + '!' for run in ('a', '1', ' ', 'ab', 'a ')]
+
+REGEX_FLAGS = re.IGNORECASE
+
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, 'POSSESSIVE_REPEAT', None)}
+GROUP_REFERENCES = {sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS}
+
+
+def compile_pattern(pattern):
+    """Compile an auto_grade_regex the same way the grader uses it; raises re.error"""
+    return re.compile(pattern.strip(), REGEX_FLAGS)
+
+
+def times_out(pattern, timeout=None):
+    """True when the pattern exceeds the match budget on one of the probe texts"""
+    regex = compile_pattern(pattern)
+    if is_linear(regex.pattern):
+        return False
+    with RegexSandbox(timeout) as sandbox:
+        # One probe at a time, so a slow pattern costs a single budget
+        return any(sandbox.fullmatch_many(regex, [text]) == [None] for text in PROBE_TEXTS)
+
+
+class _Backtracks(Exception):
+    pass
+
+
+def _count_repeats(items, repeated=False):
+    """Number of repeats of more than one item; raises _Backtracks for nesting that can blow up"""
+    count = 0
+    for op, av in items:
+        if op in GROUP_REFERENCES:
+            raise _Backtracks
+        if op is sre_constants.BRANCH:
+            if repeated:
+                raise _Backtracks
+            count += sum(_count_repeats(branch, repeated) for branch in av[1])
+        elif op in REPEATS:
+            low, high, item = av
+            if high > 1:
+                if repeated:
+                    raise _Backtracks
+                count += 1 + _count_repeats(item, True)
+            else:
+                count += _count_repeats(item, repeated)
+        elif op is sre_constants.SUBPATTERN:
+            count += _count_repeats(av[3], repeated)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            count += _count_repeats(av[1], repeated)
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            count += _count_repeats(av, repeated)
+    return count
+
+
+def is_linear(pattern):
+    """
+    Patterns whose match time grows at most linearly with the answer: no
+    backreferences and at most one repeat, with no alternation inside it.
+    """
+    if re.escape(pattern) == pattern:
+        return True
+    try:
+        return _count_repeats(sre_parse.parse(pattern, REGEX_FLAGS)) <= 1
+    except (_Backtracks, re.error):
+        return False
+
+
+def _serve(conn):
+    """Helper process loop: receive (pattern, texts), send back one result per text"""
+    # Tells the parent the helper is up, so start-up time is not taken from a match budget
+    conn.send('ready')
+    compiled = {}
+    while True:
+        try:
+            pattern, texts = conn.recv()
+        except EOFError:
+            return
+        regex = compiled.get(pattern)
+        if regex is None:
+            regex = compiled[pattern] = re.compile(pattern, REGEX_FLAGS)
+        for text in texts:
+            conn.send(regex.fullmatch(text) is not None)
+
+
+class RegexSandbox:
+    """
+    Runs fullmatch calls with a hard per-match time budget.
+    Use as a context manager so the helper process is always stopped.
+    """
+
+    def __init__(self, timeout=None):
+        if timeout is None:
+            timeout = getattr(settings, 'AUTO_GRADE_REGEX_TIMEOUT', DEFAULT_MATCH_TIMEOUT)
+        self.timeout = timeout
+        self._process = None
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        if not (parent_conn.poll(STARTUP_TIMEOUT) and parent_conn.recv() == 'ready'):
+            self.close()
+            raise RuntimeError('regex sandbox process did not start')
+
+    def close(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+            self._process = None
+            self._conn = None
+
+    def fullmatch_many(self, pattern, texts):
+        """
+        Match a compiled pattern against each text.
+        Returns one result per text: True/False, or None when the match timed out.
+        """
+        texts = list(texts)
+        if is_linear(pattern.pattern):
+            return [pattern.fullmatch(text) is not None for text in texts]
+
+        results = []
+        while texts:
+            if self._process is None:
+                self._start()
+            self._conn.send((pattern.pattern, texts))
+            for i in range(len(texts)):
+                if not self._conn.poll(self.timeout):
+                    # Catastrophic backtracking: drop the helper, skip this text
+                    self.close()
+                    results.append(None)
+                    texts = texts[i + 1:]
+                    break
+                results.append(self._conn.recv())
+            else:
+                texts = []
+        return results
@@ -0,0 +1,93 @@
+# grading/results.py
+"""
+Publishing the results of a whole exam.
+
+Totals are recomputed in one UPDATE, then score notifications are queued
+with bulk_create chunk by chunk, skipping students already notified for
+the exam, so publishing twice notifies nobody twice.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .analytics import invalidate_item_analysis
+from .autograde import finalize_attempts
+from .ranking import invalidate_ranking
+from attempts.models import Attempt, Answer
+from notifications.counters import invalidate_unread
+from notifications.models import Notification
+from notifications.outbox import build_score_notifications
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def notified_students(exam_id, student_ids):
+    """Students among student_ids that already got the score of this exam"""
+    return set(Notification.objects.filter(
+        user_id__in=student_ids,
+        notif_type='score',
+        channel='in_app',
+        extra__exam_id=exam_id
+    ).values_list('user_id', flat=True))
+
+
+def update_totals(exam):
+    """Recompute total_score of the graded attempts in one UPDATE; returns how many changed"""
+    score_sum = Subquery(
+        Answer.objects.filter(attempt=OuterRef('pk')).order_by().values('attempt').annotate(
+            total=Sum('score')
+        ).values('total')
+    )
+    total = Coalesce(score_sum, Value(0.0), output_field=FloatField())
+    stale = Attempt.objects.filter(exam=exam, status='graded').alias(new_total=total).exclude(total_score=F('new_total'))
+    return stale.update(total_score=total)
+
+
+def publish_exam_results(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Finalize the totals of an exam and notify the students not notified yet; returns counters"""
+    started = time.monotonic()
+    # Submitted attempts whose answers all have a score become graded first
+    finalize_attempts(Attempt.objects.filter(exam=exam, status='submitted'))
+    totals_changed = update_totals(exam)
+    if totals_changed:
+        invalidate_item_analysis(exam.pk)
+        invalidate_ranking(exam.pk)
+
+    graded = Attempt.objects.filter(exam=exam, status='graded').select_related('student').order_by('pk')
+    attempts = 0
+    notified = 0
+    skipped = 0
+    notifications = 0
+    last_pk = 0
+    while True:
+        chunk = list(graded.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        attempts += len(chunk)
+
+        already = notified_students(exam.pk, [attempt.student_id for attempt in chunk])
+        rows = []
+        for attempt in chunk:
+            if attempt.student_id in already:
+                skipped += 1
+                continue
+            attempt.exam = exam
+            rows.extend(build_score_notifications(attempt))
+            notified += 1
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(rows, batch_size=chunk_size)
+        invalidate_unread(row.user_id for row in rows)
+        notifications += len(rows)
+
+    return {
+        'attempts': attempts,
+        'totals_changed': totals_changed,
+        'notified': notified,
+        'skipped': skipped,
+        'notifications': notifications,
+        'elapsed': time.monotonic() - started,
+    }
@@ -0,0 +1,48 @@
+# grading/signals.py
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_item_analysis
+from .jobs import enqueue_exam_grading
+from .ranking import invalidate_ranking
+from attempts.models import Answer
+from attempts.signals import attempt_status_changed
+from questions.models import Question
+from questions.signals import exam_questions_changed
+
+_UNKNOWN = object()
+
+
+@receiver(attempt_status_changed)
+def graded_attempts_changed(sender, exam_id, old_status, new_status, **kwargs):
+    if 'graded' in (old_status, new_status):
+        invalidate_item_analysis(exam_id)
+        invalidate_ranking(exam_id)
+
+
+@receiver(exam_questions_changed)
+def questions_changed(sender, exam_id, **kwargs):
+    invalidate_item_analysis(exam_id)
+
+
+@receiver(post_init, sender=Question)
+def remember_regex(sender, instance, **kwargs):
+    instance._saved_regex = instance.__dict__.get('auto_grade_regex', _UNKNOWN) if instance.pk else _UNKNOWN
+
+
+@receiver(post_save, sender=Question)
+def requeue_manual_answers(sender, instance, created, **kwargs):
+    """Auto grade again the answers left for manual grading (e.g. a timed-out match) once the pattern changed"""
+    regex = instance.__dict__.get('auto_grade_regex', _UNKNOWN)
+    changed = instance._saved_regex is not _UNKNOWN and regex is not _UNKNOWN and regex != instance._saved_regex
+    instance._saved_regex = regex
+    if created or not changed or instance.qtype != Question.TYPE_SHORT:
+        return
+    requeued = Answer.objects.filter(
+        question=instance,
+        needs_manual=True,
+        score__isnull=True,
+        attempt__status='submitted'
+    ).update(needs_manual=False)
+    if requeued:
+        enqueue_exam_grading(instance.exam)
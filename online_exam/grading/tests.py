@@ -1,3 +1,505 @@
+# grading/tests.py
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attempts.models import Attempt, Answer
+from notifications.models import Notification
+from online_exam.versioned_cache import VersionedCache
+from questions.forms import QuestionForm
+from questions.models import Exam, Question, Choice
+from .analytics import get_item_analysis, histogram
+from .autograde import finalize_attempts, grade_exam, save_grades
+from .export import gradebook_rows
+from .jobs import Heartbeat, claim_jobs, default_workers
+from .models import AutoGraderLog, GradingJob, ManualReview
+from .ranking import get_ranking, rankings
+from .results import publish_exam_results
+from .regex_sandbox import RegexSandbox, compile_pattern, is_linear, times_out
+
+
+class ExamTestCase(TestCase):
+    """An exam with a short, a multiple-choice and a file question"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pass', role='teacher')
+        self.exam = Exam.objects.create(
+            title='Exam', topic='math', teacher=self.teacher, published=True,
+            start_at=timezone.now() - timedelta(minutes=5), duration_minutes=60,
+        )
+        self.short = Question.objects.create(exam=self.exam, text='short', qtype='short', auto_grade_regex='abc', order=1)
+        self.mcq = Question.objects.create(exam=self.exam, text='mcq', qtype='mcq', max_score=2, order=2)
+        self.right = Choice.objects.create(question=self.mcq, text='right', is_correct=True)
+        self.wrong = Choice.objects.create(question=self.mcq, text='wrong')
+        self.file = Question.objects.create(exam=self.exam, text='file', qtype='file', order=3)
+
+    def submitted_attempt(self, username, short='', choice=None, **kwargs):
+        student = User.objects.create_user(username, role='student')
+        attempt = Attempt.objects.create(student=student, exam=self.exam, status='submitted', **kwargs)
+        Answer.objects.create(attempt=attempt, question=self.short, text_answer=short)
+        Answer.objects.create(attempt=attempt, question=self.mcq, selected_choice=choice)
+        Answer.objects.create(attempt=attempt, question=self.file)
+        return attempt
+
+
+class AutoGradeTests(ExamTestCase):
+    def test_grades_in_chunks_and_leaves_files_for_manual(self):
+        right = self.submitted_attempt('s1', short=' aBc ', choice=self.right)
+        wrong = self.submitted_attempt('s2', short='xyz', choice=self.wrong)
+
+        result = grade_exam(self.exam, chunk_size=2)
+
+        self.assertEqual((result['answers'], result['auto_graded'], result['manual']), (6, 4, 2))
+        scores = dict(right.answers.values_list('question_id', 'score'))
+        self.assertEqual(scores, {self.short.pk: 1, self.mcq.pk: 2, self.file.pk: None})
+        scores = dict(wrong.answers.values_list('question_id', 'score'))
+        self.assertEqual(scores, {self.short.pk: 0, self.mcq.pk: 0, self.file.pk: None})
+        self.assertEqual(Answer.objects.filter(question=self.file, needs_manual=True).count(), 2)
+        self.assertEqual(AutoGraderLog.objects.count(), 4)
+        # The file answers keep both attempts waiting for the teacher
+        self.assertEqual(Attempt.objects.filter(status='submitted').count(), 2)
+
+    def test_finalizes_attempts_once_every_answer_is_scored(self):
+        attempt = self.submitted_attempt('s1', short='abc', choice=self.right)
+        Answer.objects.filter(question=self.file).update(score=1)
+        result = grade_exam(self.exam)
+        attempt.refresh_from_db()
+        self.assertEqual(result['attempts_graded'], 1)
+        self.assertEqual((attempt.status, attempt.total_score), ('graded', 4))
+
+    def test_save_grades_updates_once_per_distinct_grade(self):
+        attempt = self.submitted_attempt('s1')
+        answers = list(attempt.answers.all())
+        now = timezone.now()
+        for answer, score in zip(answers, (1, 1, 0)):
+            answer.score = score
+            answer.is_auto_graded = True
+            answer.graded_at = now
+        with self.assertNumQueries(2):
+            save_grades(answers)
+        self.assertEqual(sorted(attempt.answers.values_list('score', flat=True)), [0, 1, 1])
+
+
+class GradingJobTests(ExamTestCase):
+    def test_queued_job_is_reused_and_run_to_completion(self):
+        attempt = self.submitted_attempt('s1', short='abc', choice=self.right)
+        Answer.objects.filter(question=self.file).update(score=1)
+        self.client.login(username='teacher', password='pass')
+        url = reverse('grading:auto_grade_exam', args=[self.exam.pk])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(GradingJob.objects.count(), 1)
+
+        call_command('run_grading_jobs', stdout=StringIO())
+
+        job = GradingJob.objects.get()
+        self.assertEqual((job.status, job.total_attempts, job.processed_attempts, job.progress), ('done', 1, 1, 100))
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.total_score), ('graded', 4))
+
+    def test_stale_running_job_is_claimed_again(self):
+        now = timezone.now()
+        stale = GradingJob.objects.create(exam=self.exam, status='running', heartbeat_at=now - timedelta(hours=1))
+        alive = GradingJob.objects.create(exam=self.exam, status='running', heartbeat_at=now)
+        self.assertEqual([job.pk for job in claim_jobs()], [stale.pk])
+        alive.refresh_from_db()
+        self.assertEqual(alive.heartbeat_at, now)
+
+    def test_heartbeat_is_throttled(self):
+        job = GradingJob.objects.create(exam=self.exam, status='running')
+        with self.assertNumQueries(0):
+            Heartbeat(job.pk, interval=60)()
+        with self.assertNumQueries(1):
+            Heartbeat(job.pk, interval=0)()
+        job.refresh_from_db()
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_single_worker_on_sqlite(self):
+        self.assertEqual(default_workers(), 1)
+
+
+class RegexSandboxTests(ExamTestCase):
+    def question_form(self, pattern):
+        return QuestionForm(data={'text': 'q', 'qtype': 'short', 'max_score': 1, 'order': 1, 'auto_grade_regex': pattern})
+
+    def test_linear_patterns_skip_the_sandbox(self):
+        self.assertTrue(is_linear(r'^-?\d+$'))
+        self.assertTrue(is_linear(r'colou?r'))
+        self.assertFalse(is_linear(r'(a+)+$'))
+        self.assertFalse(is_linear(r'\d+\.\d+'))
+        self.assertFalse(is_linear(r'(a)\1'))
+        self.assertFalse(times_out(r'^-?\d+$'))
+
+    def test_form_rejects_catastrophic_and_invalid_patterns(self):
+        self.assertTrue(self.question_form(r'ab?c').is_valid())
+        self.assertIn('auto_grade_regex', self.question_form(r'(a+)+b').errors)
+        self.assertIn('auto_grade_regex', self.question_form(r'(ab').errors)
+
+    def test_sandbox_matches(self):
+        with RegexSandbox() as sandbox:
+            self.assertEqual(sandbox.fullmatch_many(compile_pattern(r'\d+(\.\d+)?'), ['1.5', 'x']), [True, False])
+
+    def test_timed_out_answer_is_left_for_manual_grading(self):
+        Question.objects.filter(pk=self.short.pk).update(auto_grade_regex='(a+)+b')
+        self.submitted_attempt('s1', short='a' * 40, choice=self.right)
+        grade_exam(self.exam)
+        answer = Answer.objects.get(question=self.short)
+        self.assertTrue(answer.needs_manual)
+        self.assertIsNone(answer.score)
+        self.assertTrue(AutoGraderLog.objects.get(answer=answer).needs_manual)
+        self.assertEqual(Answer.objects.get(question=self.mcq).score, 2)
+
+    def test_changing_the_pattern_requeues_manual_answers(self):
+        attempt = self.submitted_attempt('s1', short='x')
+        answer = attempt.answers.get(question=self.short)
+        Answer.objects.filter(pk=answer.pk).update(needs_manual=True)
+
+        question = Question.objects.get(pk=self.short.pk)
+        question.text = 'reworded'
+        question.save()
+        self.assertEqual(GradingJob.objects.count(), 0)
+
+        question.auto_grade_regex = 'x'
+        question.save()
+        answer.refresh_from_db()
+        self.assertFalse(answer.needs_manual)
+        self.assertEqual(GradingJob.objects.filter(exam=self.exam, status='pending').count(), 1)
+
+
+class GradeAttemptTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='teacher', password='pass')
+
+    def grade(self, attempt, score, answers=None):
+        answers = attempt.answers.all() if answers is None else answers
+        data = {f'answer_{answer.pk}-score': score for answer in answers}
+        return self.client.post(reverse('grading:grade_attempt', args=[attempt.pk]), data)
+
+    def test_regrading_updates_the_reviews(self):
+        attempt = self.submitted_attempt('s1')
+        self.grade(attempt, '1')
+        self.grade(attempt, '0.5')
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.total_score), ('graded', 1.5))
+        self.assertEqual(ManualReview.objects.count(), 3)
+        self.assertEqual(set(ManualReview.objects.values_list('final_score', flat=True)), {0.5})
+
+    def test_partially_graded_attempt_stays_submitted(self):
+        attempt = self.submitted_attempt('s1')
+        self.grade(attempt, '1', answers=attempt.answers.filter(question=self.short))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'submitted')
+        self.assertEqual(Answer.objects.get(question=self.short).score, 1)
+
+    def test_query_count_does_not_grow_with_answers(self):
+        small = self.submitted_attempt('s1')
+        with CaptureQueriesContext(connection) as queries:
+            self.grade(small, '1')
+        large = self.submitted_attempt('s2')
+        for order in range(4, 10):
+            question = Question.objects.create(exam=self.exam, text='extra', qtype='short', order=order)
+            Answer.objects.create(attempt=large, question=question)
+        with self.assertNumQueries(len(queries)):
+            self.grade(large, '1')
+        large.refresh_from_db()
+        self.assertEqual(large.total_score, 9)
+
+
+class GradebookExportTests(ExamTestCase):
+    def test_one_row_per_exported_attempt(self):
+        graded = self.submitted_attempt('s1', submitted_at=timezone.now())
+        graded.answers.filter(question=self.short).update(score=1)
+        graded.answers.filter(question=self.mcq).update(score=2)
+        Attempt.objects.filter(pk=graded.pk).update(status='graded', total_score=3)
+        empty = User.objects.create_user('s2', first_name='Ali', role='student')
+        Attempt.objects.create(student=empty, exam=self.exam, status='submitted')
+        Attempt.objects.create(student=User.objects.create_user('s3'), exam=self.exam)
+
+        header, first, second = gradebook_rows(self.exam, chunk_size=2)
+        self.assertEqual(len(header), 8)
+        self.assertEqual(first[:2] + first[4:], ['s1', '', '1', '2', '', '3'])
+        # An attempt without answers still gets its row
+        self.assertEqual(second, ['s2', 'Ali', 'ارسال شده', '', '', '', '', ''])
+
+    def test_formula_cells_are_escaped(self):
+        student = User.objects.create_user('=HYPERLINK(1)', first_name='+x', role='student')
+        Attempt.objects.create(student=student, exam=self.exam, status='submitted')
+        self.assertEqual(list(gradebook_rows(self.exam))[1][:2], ["'=HYPERLINK(1)", "'+x"])
+
+    def test_view_streams_csv_for_the_exam_teacher(self):
+        self.submitted_attempt('s1')
+        url = reverse('grading:gradebook_export', args=[self.exam.pk])
+        User.objects.create_user('other', password='pass', role='teacher')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.login(username='teacher', password='pass')
+        response = self.client.get(url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('\ufeff'))
+        self.assertEqual(len(body.splitlines()), 2)
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+
+class PublishResultsTests(ExamTestCase):
+    def graded_attempts(self, count):
+        students = User.objects.bulk_create([
+            User(username=f's{i}', role='student', email=f's{i}@example.com' if i % 2 else '') for i in range(count)
+        ])
+        attempts = Attempt.objects.bulk_create([
+            Attempt(student=student, exam=self.exam, status='graded', deadline=timezone.now()) for student in students
+        ])
+        Answer.objects.bulk_create([Answer(attempt=attempt, question=self.mcq, score=2) for attempt in attempts])
+        return attempts
+
+    def test_publishes_each_student_once(self):
+        self.graded_attempts(5)
+        result = publish_exam_results(self.exam, chunk_size=2)
+        self.assertEqual((result['attempts'], result['totals_changed'], result['notified']), (5, 5, 5))
+        # In-app for everyone, email for the two students with an address
+        self.assertEqual(result['notifications'], 7)
+        self.assertEqual(set(Attempt.objects.values_list('total_score', flat=True)), {2})
+
+        result = publish_exam_results(self.exam, chunk_size=2)
+        self.assertEqual((result['notified'], result['skipped'], result['totals_changed']), (0, 5, 0))
+        self.assertEqual(Notification.objects.count(), 7)
+
+    def test_fully_scored_submissions_are_finalized_first(self):
+        attempt = self.submitted_attempt('s1')
+        attempt.answers.update(score=1)
+        self.assertEqual(publish_exam_results(self.exam)['notified'], 1)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.total_score), ('graded', 3))
+
+    def test_view(self):
+        self.graded_attempts(1)
+        self.client.login(username='teacher', password='pass')
+        response = self.client.post(reverse('grading:publish_results', args=[self.exam.pk]))
+        self.assertRedirects(response, reverse('questions:exam_detail', args=[self.exam.pk]), fetch_redirect_response=False)
+        self.assertEqual(Notification.objects.filter(channel='in_app').count(), 1)
+
+
+class ItemAnalysisTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Only the five best students pick the right choice
+        for i in range(10):
+            attempt = self.submitted_attempt(f's{i}', choice=self.right if i >= 5 else self.wrong)
+            attempt.answers.filter(question=self.short).update(score=i % 2)
+            attempt.answers.filter(question=self.mcq).update(score=2 if i >= 5 else 0)
+            attempt.answers.filter(question=self.file).update(score=i / 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            finalize_attempts(Attempt.objects.filter(exam=self.exam))
+
+    def test_difficulty_discrimination_and_histograms(self):
+        analysis = get_item_analysis(self.exam)
+        self.assertEqual(analysis['attempts'], 10)
+        short, mcq, file = analysis['questions']
+        self.assertAlmostEqual(mcq['difficulty'], 0.5)
+        self.assertAlmostEqual(mcq['discrimination'], 1.0)
+        self.assertEqual([choice['count'] for choice in mcq['choices']], [5, 5])
+        self.assertAlmostEqual(short['difficulty'], 0.5)
+        self.assertEqual(sum(bucket['count'] for bucket in file['histogram']), 10)
+        self.assertEqual(sum(bucket['count'] for bucket in analysis['total_histogram']), 10)
+
+    def test_cached_until_a_graded_attempt_changes(self):
+        get_item_analysis(self.exam)
+        with self.assertNumQueries(0):
+            get_item_analysis(self.exam)
+        attempt = Attempt.objects.filter(exam=self.exam).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt.status = 'submitted'
+            attempt.save()
+        self.assertEqual(get_item_analysis(self.exam)['attempts'], 9)
+
+    def test_histogram_buckets(self):
+        buckets = histogram({0: 1, 0.5: 2, 1: 3}, 1, 2)
+        self.assertEqual([bucket['count'] for bucket in buckets], [1, 5])
+
+    def test_view(self):
+        self.client.login(username='teacher', password='pass')
+        response = self.client.get(reverse('grading:exam_analysis', args=[self.exam.pk]))
+        self.assertContains(response, 'ضریب تمیز')
+
+
+class RankingTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        rankings.clear_local()
+        self.attempts = []
+        for i, score in enumerate([5, 3, 3, 1, 8]):
+            student = User.objects.create_user(f's{i}', password='pass' if i == 0 else None, role='student')
+            self.attempts.append(
+                Attempt.objects.create(student=student, exam=self.exam, status='graded', total_score=score)
+            )
+
+    def test_rank_percentile_and_leaders(self):
+        ranking = get_ranking(self.exam.pk)
+        self.assertEqual(ranking.scores, [1, 3, 3, 5, 8])
+        self.assertEqual([ranking.rank(score) for score in (8, 5, 3, 1)], [1, 2, 3, 5])
+        self.assertEqual(ranking.percentile(3), 40.0)
+        self.assertEqual([leader['score'] for leader in ranking.top(2)], [8, 5])
+
+    def test_cached_until_graded_attempts_change(self):
+        get_ranking(self.exam.pk)
+        with self.assertNumQueries(0):
+            get_ranking(self.exam.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attempts[3].status = 'submitted'
+            self.attempts[3].save()
+        self.assertEqual(len(get_ranking(self.exam.pk)), 4)
+
+    def test_student_sees_own_rank_only(self):
+        self.client.login(username='s0', password='pass')
+        response = self.client.get(reverse('attempts:rank', args=[self.attempts[0].pk]))
+        self.assertEqual(response.json()['rank'], 2)
+        self.assertEqual(self.client.get(reverse('attempts:rank', args=[self.attempts[1].pk])).status_code, 404)
+
+    def test_leaderboard(self):
+        self.client.login(username='teacher', password='pass')
+        response = self.client.get(reverse('grading:exam_leaderboard', args=[self.exam.pk]), {'n': 3})
+        self.assertEqual([leader['rank'] for leader in response.json()['leaders']], [1, 2, 3])
+
+
+class VersionedCacheTests(TestCase):
+    def test_keeps_the_most_recently_used_values(self):
+        cache.clear()
+        built = []
+        values = VersionedCache('test', 60, local_size=2)
+
+        def build(object_id):
+            built.append(object_id)
+            return object_id * 10
+
+        for object_id in (1, 2, 1, 3):
+            self.assertEqual(values.get(object_id, build)[1], object_id * 10)
+        self.assertEqual(list(values.loaded), [1, 3])
+        # Evicted locally, still in the shared cache
+        values.get(2, build)
+        self.assertEqual(built, [1, 2, 3])
+
+        values.bump(1)
+        values.get(1, build)
+        self.assertEqual(built, [1, 2, 3, 1])
+
+
+class TemporaryMediaMixin:
+    """Store uploaded files in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class AnswerFileTests(TemporaryMediaMixin, ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt = self.submitted_attempt('s1')
+        self.answer = self.attempt.answers.get(question=self.file)
+        self.data = bytes(range(256)) * 40
+        self.answer.uploaded_file.save('برگه.pdf', ContentFile(self.data), save=True)
+        self.url = reverse('grading:answer_file', args=[self.answer.pk])
+        self.client.login(username='teacher', password='pass')
+
+    def get(self, headers=None):
+        return self.client.get(self.url, headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_only_the_exam_teacher_can_download(self):
+        User.objects.create_user('other', password='pass', role='teacher')
+        self.client.login(username='other', password='pass')
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_whole_file_with_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response['ETag'], '"%s"' % hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('inline', response['Content-Disposition'])
+        self.assertEqual(self.get({'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get({'Range': 'bytes=100-199'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.body(self.get({'Range': 'bytes=-10'})), self.data[-10:])
+        self.assertEqual(self.get({'Range': 'bytes=99999-'}).status_code, 416)
+        # A stale If-Range gets the whole file
+        self.assertEqual(self.get({'Range': 'bytes=0-9', 'If-Range': '"stale"'}).status_code, 200)
+
+    def test_web_server_offload(self):
+        with self.settings(SENDFILE_BACKEND='nginx'):
+            response = self.get()
+            self.assertTrue(response['X-Accel-Redirect'].startswith('/protected-media/answers/blobs/'))
+            self.assertEqual(response.content, b'')
+        with self.settings(SENDFILE_BACKEND='apache'):
+            self.assertTrue(os.path.isabs(self.get()['X-Sendfile']))
+
+    def test_grading_page_links_the_file(self):
+        response = self.client.get(reverse('grading:grade_attempt', args=[self.attempt.pk]))
+        self.assertContains(response, self.url)
+
+
+class AnswerFilesZipTests(TemporaryMediaMixin, ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.scan = Question.objects.create(exam=self.exam, text='scan', qtype='file', order=4)
+        self.files = {}
+        for username in ('bob', 'alice'):
+            attempt = self.submitted_attempt(username, submitted_at=timezone.now())
+            Answer.objects.create(attempt=attempt, question=self.scan)
+            for answer in attempt.answers.filter(question__qtype='file').select_related('question'):
+                data = os.urandom(300000)
+                answer.uploaded_file.save(f'f{answer.question.order}.pdf', ContentFile(data), save=True)
+                self.files[f'{username}/q{answer.question.order:03d}_f{answer.question.order}.pdf'] = data
+        # Attempts still in progress are left out
+        running = Attempt.objects.create(student=User.objects.create_user('carol'), exam=self.exam)
+        Answer.objects.create(attempt=running, question=self.file).uploaded_file.save('x.pdf', ContentFile(b'x'), save=True)
+
+        self.url = reverse('grading:answer_files_zip', args=[self.exam.pk])
+        self.client.login(username='teacher', password='pass')
+
+    def test_streams_every_file_by_student(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        parts = list(response.streaming_content)
+        # Written out a chunk at a time, never a whole file
+        self.assertLess(max(len(part) for part in parts), 200000)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(parts)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), sorted(self.files))
+        for name, data in self.files.items():
+            self.assertEqual(archive.read(name), data)
 
-# Create your tests here.
+    def test_one_question(self):
+        response = self.client.get(self.url, {'question': self.scan.pk})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ['alice/q004_f4.pdf', 'bob/q004_f4.pdf'])
+        self.assertEqual(self.client.get(self.url, {'question': 'abc'}).status_code, 404)
@@ -7,5 +7,12 @@ app_name = 'grading'
 urlpatterns = [
     path('', views.AttemptListView.as_view(), name='attempt_list'),
     path('<int:attempt_pk>/', views.GradeAttemptView.as_view(), name='grade_attempt'),
+    path('answers/<int:answer_pk>/file/', views.AnswerFileView.as_view(), name='answer_file'),
     path('<int:attempt_pk>/auto/', views.AutoGradeAttemptView.as_view(), name='auto_grade'),
+    path('exams/<int:exam_pk>/auto/', views.AutoGradeExamView.as_view(), name='auto_grade_exam'),
+    path('exams/<int:exam_pk>/publish/', views.PublishResultsView.as_view(), name='publish_results'),
+    path('exams/<int:exam_pk>/analysis/', views.ExamAnalysisView.as_view(), name='exam_analysis'),
+    path('exams/<int:exam_pk>/leaderboard/', views.ExamLeaderboardView.as_view(), name='exam_leaderboard'),
+    path('exams/<int:exam_pk>/gradebook.csv', views.GradebookExportView.as_view(), name='gradebook_export'),
+    path('exams/<int:exam_pk>/files.zip', views.AnswerFilesZipView.as_view(), name='answer_files_zip'),
 ]
\ No newline at end of file
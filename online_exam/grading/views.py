@@ -1,17 +1,27 @@
 # grading/views.py
-import re
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
 
-from .models import ManualReview, AutoGraderLog
+from .models import ManualReview, GradingJob
 from .forms import GradeAnswerForm
+from .analytics import get_item_analysis, invalidate_item_analysis
+from .archive import stream_answer_files_zip
+from .autograde import grade_attempts
+from .export import stream_gradebook_csv
+from .files import serve_file
+from .jobs import enqueue_exam_grading
+from .ranking import LEADERBOARD_SIZE, get_ranking, invalidate_ranking
+from .results import publish_exam_results
 from attempts.models import Attempt, Answer
-from questions.models import Question
-from notifications.models import Notification
+from questions.models import Exam, Question
+from notifications.outbox import send_score_notification
+from online_exam.pagination import paginate_request
 
 
 def teacher_required(view_func):
@@ -26,74 +36,6 @@ def teacher_required(view_func):
     return wrapper
 
 
-def auto_grade_answer(answer):
-    """Automatically grade short answer and MCQ questions"""
-    question = answer.question
-    
-    if question.qtype == Question.TYPE_MCQ:
-        # MCQ auto grading
-        if answer.selected_choice and answer.selected_choice.is_correct:
-            answer.score = question.max_score
-            matched = True
-        else:
-            answer.score = 0
-            matched = False
-        
-        answer.is_auto_graded = True
-        answer.graded_at = timezone.now()
-        answer.save()
-        
-        AutoGraderLog.objects.create(
-            answer=answer,
-            matched=matched,
-            awarded_score=answer.score,
-            reason='چندگزینه‌ای - تصحیح خودکار'
-        )
-        return True
-    
-    elif question.qtype == Question.TYPE_SHORT and question.auto_grade_regex:
-        # Short answer auto grading with regex
-        pattern = question.auto_grade_regex.strip()
-        text = (answer.text_answer or '').strip()
-        
-        try:
-            if re.fullmatch(pattern, text, re.IGNORECASE):
-                answer.score = question.max_score
-                matched = True
-            else:
-                answer.score = 0
-                matched = False
-            
-            answer.is_auto_graded = True
-            answer.graded_at = timezone.now()
-            answer.save()
-            
-            AutoGraderLog.objects.create(
-                answer=answer,
-                matched=matched,
-                awarded_score=answer.score,
-                reason=f'تطبیق با الگو: {pattern}'
-            )
-            return True
-        except re.error:
-            # Invalid regex, needs manual grading
-            answer.needs_manual = True
-            answer.save()
-            return False
-    
-    elif question.qtype == Question.TYPE_FILE:
-        # File answers always need manual grading
-        answer.needs_manual = True
-        answer.save()
-        return False
-    
-    else:
-        # No auto grade regex, needs manual
-        answer.needs_manual = True
-        answer.save()
-        return False
-
-
 @method_decorator([login_required, teacher_required], name='dispatch')
 class AttemptListView(View):
     template_name = 'grading/attempt_list.html'
@@ -103,8 +45,17 @@ class AttemptListView(View):
             exam__teacher=request.user,
             status__in=['submitted', 'graded']
         ).select_related('exam', 'student')
+        page = paginate_request(request, attempts, '-start_time')
+        grading_jobs = GradingJob.objects.filter(
+            exam__teacher=request.user,
+            status__in=['pending', 'running']
+        ).select_related('exam')
         
-        return render(request, self.template_name, {'attempts': attempts})
+        return render(request, self.template_name, {
+            'attempts': page,
+            'page': page,
+            'grading_jobs': grading_jobs
+        })
 
 
 @method_decorator([login_required, teacher_required], name='dispatch')
@@ -134,9 +85,17 @@ class GradeAttemptView(View):
         })
 
     def post(self, request, attempt_pk):
-        attempt = get_object_or_404(Attempt, pk=attempt_pk, exam__teacher=request.user)
-        answers = attempt.answers.all()
+        attempt = get_object_or_404(
+            Attempt.objects.select_related('exam', 'student'),
+            pk=attempt_pk,
+            exam__teacher=request.user
+        )
+        answers = attempt.answers.select_related('question')
         
+        # Validate every form in memory before touching the database
+        now = timezone.now()
+        graded_answers = []
+        reviews = []
         total_score = 0
         all_graded = True
         
@@ -153,37 +112,50 @@ class GradeAttemptView(View):
                 
                 answer.score = score
                 answer.graded_by = request.user
-                answer.graded_at = timezone.now()
+                answer.graded_at = now
                 answer.is_auto_graded = False
                 answer.needs_manual = False
-                answer.save()
+                graded_answers.append(answer)
                 
-                # Create or update manual review
-                review, created = ManualReview.objects.get_or_create(answer=answer)
-                review.reviewer = request.user
-                review.final_score = score
-                review.comments = comments
-                review.reviewed_at = timezone.now()
-                review.save()
+                reviews.append(ManualReview(
+                    answer=answer,
+                    reviewer=request.user,
+                    final_score=score,
+                    comments=comments,
+                    reviewed_at=now
+                ))
                 
                 total_score += score
             else:
                 all_graded = False
         
-        if all_graded:
-            attempt.total_score = total_score
-            attempt.status = 'graded'
-            attempt.save()
-            
-            # Send notification to student
-            Notification.objects.create(
-                user=attempt.student,
-                notif_type='score',
-                channel='in_app',
-                title=f'نمره آزمون {attempt.exam.title}',
-                message=f'نمره شما در آزمون {attempt.exam.title}: {total_score} از {attempt.exam.total_score}'
+        with transaction.atomic():
+            Answer.objects.bulk_update(
+                graded_answers,
+                ['score', 'graded_by', 'graded_at', 'is_auto_graded', 'needs_manual']
             )
+            # Create or update manual reviews in one upsert
+            ManualReview.objects.bulk_create(
+                reviews,
+                update_conflicts=True,
+                unique_fields=['answer'],
+                update_fields=['reviewer', 'final_score', 'comments', 'reviewed_at']
+            )
+            
+            if all_graded:
+                attempt.total_score = total_score
+                attempt.status = 'graded'
+                attempt.save(update_fields=['total_score', 'status'])
+                
+                # Queue the notifications; email/SMS go out from the dispatcher
+                send_score_notification(attempt)
             
+            # Re-grading a graded attempt changes the statistics without a status change
+            if graded_answers:
+                invalidate_item_analysis(attempt.exam_id)
+                invalidate_ranking(attempt.exam_id)
+        
+        if all_graded:
             messages.success(request, 'نمره‌گذاری با موفقیت انجام شد.')
         else:
             messages.warning(request, 'برخی پاسخ‌ها نمره‌گذاری نشد.')
@@ -191,6 +163,22 @@ class GradeAttemptView(View):
         return redirect('grading:attempt_list')
 
 
+@method_decorator([login_required, teacher_required], name='dispatch')
+class AnswerFileView(View):
+    """The uploaded file of an answer, for the teacher of its exam"""
+
+    def get(self, request, answer_pk):
+        answer = get_object_or_404(
+            Answer.objects.only('uploaded_file'),
+            pk=answer_pk,
+            attempt__exam__teacher=request.user
+        )
+        if not answer.uploaded_file:
+            raise Http404('فایلی آپلود نشده است')
+        
+        return serve_file(request, answer.uploaded_file.storage, answer.uploaded_file.name, answer.file_name)
+
+
 @method_decorator([login_required, teacher_required], name='dispatch')
 class AutoGradeAttemptView(View):
     """Auto grade MCQ and short answer questions"""
@@ -198,26 +186,107 @@ class AutoGradeAttemptView(View):
     def post(self, request, attempt_pk):
         attempt = get_object_or_404(Attempt, pk=attempt_pk, exam__teacher=request.user)
         
-        auto_graded_count = 0
-        manual_needed_count = 0
-        
-        for answer in attempt.answers.all():
-            if answer.score is None:  # Not already graded
-                if auto_grade_answer(answer):
-                    auto_graded_count += 1
-                else:
-                    manual_needed_count += 1
-        
-        # Calculate total score if all graded
-        answers = attempt.answers.all()
-        if all(a.score is not None for a in answers):
-            attempt.total_score = sum(a.score for a in answers)
-            attempt.status = 'graded'
-            attempt.save()
+        result = grade_attempts(attempt.exam_id, Attempt.objects.filter(pk=attempt.pk))
         
         messages.success(request, 
-            f'{auto_graded_count} پاسخ به صورت خودکار تصحیح شد. '
-            f'{manual_needed_count} پاسخ نیاز به تصحیح دستی دارد.'
+            f'{result["auto_graded"]} پاسخ به صورت خودکار تصحیح شد. '
+            f'{result["manual"]} پاسخ نیاز به تصحیح دستی دارد.'
         )
         
-        return redirect('grading:grade_attempt', attempt_pk=attempt_pk)
\ No newline at end of file
+        return redirect('grading:grade_attempt', attempt_pk=attempt_pk)
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class AutoGradeExamView(View):
+    """Queue all submitted attempts of an exam for auto grading"""
+
+    def post(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+        
+        # Grading a whole exam can take minutes; hand it to the background workers
+        enqueue_exam_grading(exam, requested_by=request.user)
+        
+        messages.success(request, f'تصحیح خودکار آزمون {exam.title} در صف قرار گرفت.')
+        return redirect('grading:attempt_list')
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class PublishResultsView(View):
+    """Send the scores of all graded attempts of an exam to their students"""
+
+    def post(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+        
+        result = publish_exam_results(exam)
+        
+        if result['notified']:
+            messages.success(request, f'نتایج آزمون {exam.title} برای {result["notified"]} دانشجو ارسال شد.')
+        else:
+            messages.info(request, 'نتیجه جدیدی برای ارسال وجود ندارد.')
+        return redirect('questions:exam_detail', pk=exam.pk)
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class ExamAnalysisView(View):
+    """Per question difficulty, discrimination and score distributions of an exam"""
+    template_name = 'grading/exam_analysis.html'
+
+    def get(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+        analysis = get_item_analysis(exam)
+        
+        return render(request, self.template_name, {
+            'exam': exam,
+            'analysis': analysis
+        })
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class ExamLeaderboardView(View):
+    """JSON leaderboard of an exam: the top n graded attempts"""
+
+    def get(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+        try:
+            n = max(1, min(int(request.GET.get('n', 10)), LEADERBOARD_SIZE))
+        except ValueError:
+            n = 10
+        ranking = get_ranking(exam.pk)
+        
+        return JsonResponse({
+            'exam_id': exam.pk,
+            'total': len(ranking),
+            'leaders': ranking.top(n)
+        })
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class GradebookExportView(View):
+    """Stream the score matrix of an exam as CSV"""
+
+    def get(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+
+        response = StreamingHttpResponse(stream_gradebook_csv(exam), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="gradebook-exam-{exam.pk}.csv"'
+        return response
+
+
+@method_decorator([login_required, teacher_required], name='dispatch')
+class AnswerFilesZipView(View):
+    """Stream the uploaded files of an exam, or of one question (?question=), as a ZIP archive"""
+
+    def get(self, request, exam_pk):
+        exam = get_object_or_404(Exam, pk=exam_pk, teacher=request.user)
+        question = None
+        filename = f'exam-{exam.pk}-files.zip'
+        question_pk = request.GET.get('question')
+        if question_pk:
+            if not question_pk.isdigit():
+                raise Http404
+            question = get_object_or_404(Question, pk=question_pk, exam=exam)
+            filename = f'exam-{exam.pk}-question-{question.pk}-files.zip'
+
+        response = StreamingHttpResponse(stream_answer_files_zip(exam, question=question), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
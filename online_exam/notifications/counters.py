@@ -0,0 +1,67 @@
+# notifications/counters.py
+"""
+Cached unread notification counters.
+
+The unread count of a user (unread in-app notifications) lives in the cache
+and is adjusted with incr/decr as notifications are created, read or
+deleted, once the change is committed; a rolled back change leaves the
+counter alone. The entry expires after UNREAD_COUNT_CACHE_TTL seconds and is
+then recounted from the database, which reconciles any drift. Code that
+creates or updates notifications in bulk must call invalidate_unread() for
+the affected users.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+
+DEFAULT_TTL = 300
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _ttl():
+    return getattr(settings, 'UNREAD_COUNT_CACHE_TTL', DEFAULT_TTL)
+
+
+def unread_notifications(user_id):
+    return Notification.objects.filter(user_id=user_id, channel='in_app', sent=False)
+
+
+def get_unread_count(user_id):
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = unread_notifications(user_id).count()
+        cache.set(_key(user_id), count, _ttl())
+    return count
+
+
+async def aget_unread_count(user_id):
+    count = await cache.aget(_key(user_id))
+    if count is None:
+        count = await unread_notifications(user_id).acount()
+        await cache.aset(_key(user_id), count, _ttl())
+    return count
+
+
+def _adjust(user_id, delta):
+    try:
+        count = cache.incr(_key(user_id), delta)
+    except ValueError:
+        return
+    if count < 0:
+        cache.delete(_key(user_id))
+
+
+def adjust_unread(user_id, delta):
+    """Add delta to a cached counter once the transaction commits; a missing counter is left to be recounted"""
+    transaction.on_commit(lambda: _adjust(user_id, delta))
+
+
+def invalidate_unread(user_ids):
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    # After commit, so a concurrent read can't cache the old count again
+    transaction.on_commit(lambda: cache.delete_many(keys))
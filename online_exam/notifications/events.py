@@ -0,0 +1,57 @@
+# notifications/events.py
+"""
+Server-Sent Events helpers.
+
+Browsers keep one EventSource connection open instead of polling. Streams
+are async generators served by the ASGI application; each stream closes
+itself after EVENT_STREAM_MAX_AGE seconds and the browser reconnects, so
+no connection outlives a deploy for long.
+
+Under WSGI (e.g. runserver) Django would buffer an async stream until it
+ends, so there the views send one round of events and close, and the retry
+delay makes EventSource poll every EVENT_STREAM_INTERVAL seconds instead.
+"""
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+DEFAULT_INTERVAL = 15
+DEFAULT_MAX_AGE = 300
+RECONNECT_DELAY_MS = 3000
+
+
+def stream_interval():
+    return getattr(settings, 'EVENT_STREAM_INTERVAL', DEFAULT_INTERVAL)
+
+
+def stream_max_age():
+    return getattr(settings, 'EVENT_STREAM_MAX_AGE', DEFAULT_MAX_AGE)
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def can_stream(request):
+    """Only the ASGI handler sends an async stream as it is produced"""
+    return isinstance(request, ASGIRequest)
+
+
+def sse_retry(streaming=True):
+    """Tell the browser how long to wait before reconnecting; one poll interval when not streaming"""
+    delay = RECONNECT_DELAY_MS if streaming else stream_interval() * 1000
+    return f'retry: {delay}\n\n'
+
+
+def sse_keepalive():
+    return ': keepalive\n\n'
+
+
+def sse_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
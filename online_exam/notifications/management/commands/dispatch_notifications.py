@@ -0,0 +1,32 @@
+# notifications/management/commands/dispatch_notifications.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import DEFAULT_BATCH_SIZE, dispatch_pending
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued email and SMS notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of notifications sent over one connection')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for due notifications instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            totals = dispatch_pending(batch_size=options['batch_size'])
+            if totals['claimed'] or not options['loop']:
+                style = self.style.SUCCESS if not (totals['retried'] or totals['given_up']) else self.style.WARNING
+                self.stdout.write(style(
+                    f'{totals["sent"]} sent, {totals["retried"]} to retry, {totals["given_up"]} given up '
+                    f'in {totals["batches"]} batches, {totals["elapsed"]:.2f}s ({totals["rate"]:.0f} messages/sec)'
+                ))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
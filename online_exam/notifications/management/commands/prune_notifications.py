@@ -0,0 +1,25 @@
+# notifications/management/commands/prune_notifications.py
+from django.core.management.base import BaseCommand
+
+from notifications.retention import DEFAULT_BATCH_SIZE, prune_notifications, retention_days
+
+
+class Command(BaseCommand):
+    help = 'Deletes read and delivered notifications older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Retention in days (default: NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of notifications deleted per batch')
+        parser.add_argument('--archive', default=None,
+                            help='Append the deleted notifications to this JSON Lines file')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        if options['archive']:
+            with open(options['archive'], 'a', encoding='utf-8') as archive:
+                deleted = prune_notifications(days, options['batch_size'], archive)
+        else:
+            deleted = prune_notifications(days, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} notifications older than {days} days'))
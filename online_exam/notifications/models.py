@@ -23,12 +23,32 @@ class Notification(models.Model):
     sent = models.BooleanField(default=False)
     sent_at = models.DateTimeField(blank=True, null=True)
     extra = models.JSONField(blank=True, null=True)
+    # Email/SMS outbox state: sent marks delivery, next_attempt_at is empty once delivery gave up
+    delivery_attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["sent", "next_attempt_at"]),
+            models.Index(fields=["user", "channel", "sent"]),
+        ]
 
     def mark_sent(self):
-        self.sent = True
+        """Mark as sent (read, for in-app ones); returns False when another request already did"""
         from django.utils import timezone
-        self.sent_at = timezone.now()
-        self.save()
+        from .counters import adjust_unread
+        now = timezone.now()
+        # Conditional, so two concurrent calls decrement the unread counter once
+        updated = Notification.objects.filter(pk=self.pk, sent=False).update(sent=True, sent_at=now)
+        if updated:
+            self.sent_at = now
+            if self.channel == "in_app":
+                adjust_unread(self.user_id, -1)
+        self.sent = True
+        self._saved_unread = False
+        return bool(updated)
 
     def __str__(self):
         return f"Notification to {self.user} - {self.title}"
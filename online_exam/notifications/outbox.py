@@ -0,0 +1,233 @@
+# notifications/outbox.py
+"""
+Notification outbox.
+
+Requests never talk to a mail server or SMS provider: they only insert
+Notification rows, in the same transaction as the change they report. Email
+and SMS rows are due for delivery at next_attempt_at; the
+dispatch_notifications worker claims due rows in batches, sends all emails
+of a batch over one SMTP connection and all SMS over one backend session,
+and marks each row delivered or schedules a retry with exponential backoff.
+In-app rows need no delivery, their sent flag means "read".
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .counters import invalidate_unread
+from .models import Notification
+from .sms import get_sms_backend
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+# A claimed batch is retried by another worker if this one dies before finishing it
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+DELIVERY_FIELDS = ['sent', 'sent_at', 'delivery_attempts', 'next_attempt_at', 'last_error']
+
+
+def max_attempts():
+    return getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+
+def retry_delay(attempts):
+    """Backoff before retry number `attempts`: 30s, 1m, 2m, 4m ... capped at one hour"""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def build_score_notifications(attempt, now=None):
+    """
+    Notification rows announcing the score of a graded attempt: one in-app
+    row, plus an email and an SMS row when the student has an address/number.
+    attempt.exam and attempt.student should be loaded already.
+    """
+    if now is None:
+        now = timezone.now()
+    student = attempt.student
+    exam = attempt.exam
+    score = attempt.total_score
+    title = f'نمره آزمون {exam.title}'
+    extra = {'exam_id': exam.id, 'attempt_id': attempt.id, 'score': score}
+
+    notifications = [Notification(
+        user=student,
+        notif_type='score',
+        channel='in_app',
+        title=title,
+        message=f'نمره شما در آزمون {exam.title}: {score} از {exam.total_score}',
+        extra=extra
+    )]
+    if student.email:
+        notifications.append(Notification(
+            user=student,
+            notif_type='score',
+            channel='email',
+            title=title,
+            message=f'سلام {student.get_full_name() or student.username}،\n\n'
+                    f'نمره شما در آزمون {exam.title}: {score} از {exam.total_score}\n\n'
+                    f'با تشکر',
+            extra=extra,
+            next_attempt_at=now
+        ))
+    if student.phone_number:
+        notifications.append(Notification(
+            user=student,
+            notif_type='score',
+            channel='sms',
+            title=title,
+            message=f'نمره شما در آزمون {exam.title}: {score} از {exam.total_score}',
+            extra=extra,
+            next_attempt_at=now
+        ))
+    return notifications
+
+
+def send_score_notification(attempt):
+    """Queue the score notifications of an attempt; delivery happens in the dispatcher"""
+    notifications = Notification.objects.bulk_create(build_score_notifications(attempt))
+    invalidate_unread([attempt.student_id])
+    return notifications
+
+
+def claim_due(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Claim up to batch_size undelivered email/SMS rows that are due"""
+    if now is None:
+        now = timezone.now()
+    due = Notification.objects.filter(sent=False, next_attempt_at__lte=now).order_by('next_attempt_at', 'pk')
+    ids = list(due.values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    # Push the claimed rows out of the due window; a concurrent worker claims only what is left
+    lease = now + CLAIM_TIMEOUT
+    Notification.objects.filter(pk__in=ids, sent=False, next_attempt_at__lte=now).update(next_attempt_at=lease)
+    return list(Notification.objects.filter(pk__in=ids, next_attempt_at=lease).select_related('user'))
+
+
+def _delivered(notification, now):
+    notification.sent = True
+    notification.sent_at = now
+    notification.delivery_attempts += 1
+    notification.next_attempt_at = None
+    notification.last_error = ''
+
+
+def _failed(notification, error, now, retry=True):
+    """Schedule a retry; returns False when the notification is given up"""
+    notification.delivery_attempts += 1
+    notification.last_error = str(error)
+    if retry and notification.delivery_attempts < max_attempts():
+        notification.next_attempt_at = now + retry_delay(notification.delivery_attempts)
+        return True
+    notification.next_attempt_at = None
+    return False
+
+
+def _send_emails(notifications, now, counters):
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com')
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for notification in notifications:
+            counters['retried' if _failed(notification, e, now) else 'given_up'] += 1
+        return
+
+    try:
+        for notification in notifications:
+            if not notification.user.email:
+                _failed(notification, 'کاربر ایمیل ندارد', now, retry=False)
+                counters['given_up'] += 1
+                continue
+            message = EmailMessage(
+                subject=notification.title,
+                body=notification.message,
+                from_email=from_email,
+                to=[notification.user.email],
+                connection=connection
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                counters['retried' if _failed(notification, e, now) else 'given_up'] += 1
+            else:
+                _delivered(notification, now)
+                counters['sent'] += 1
+    finally:
+        connection.close()
+
+
+def _send_sms(notifications, now, counters):
+    backend = get_sms_backend()
+    try:
+        backend.open()
+    except Exception as e:
+        for notification in notifications:
+            counters['retried' if _failed(notification, e, now) else 'given_up'] += 1
+        return
+
+    try:
+        for notification in notifications:
+            if not notification.user.phone_number:
+                _failed(notification, 'کاربر شماره تلفن ندارد', now, retry=False)
+                counters['given_up'] += 1
+                continue
+            try:
+                backend.send(notification.user.phone_number, notification.message)
+            except Exception as e:
+                counters['retried' if _failed(notification, e, now) else 'given_up'] += 1
+            else:
+                _delivered(notification, now)
+                counters['sent'] += 1
+    finally:
+        backend.close()
+
+
+def dispatch_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Deliver one batch of due notifications.
+    Returns counters: claimed, sent, retried, given_up and elapsed seconds.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    notifications = claim_due(batch_size, now)
+    counters = {'claimed': len(notifications), 'sent': 0, 'retried': 0, 'given_up': 0}
+
+    emails = [n for n in notifications if n.channel == 'email']
+    sms = [n for n in notifications if n.channel == 'sms']
+    if emails:
+        _send_emails(emails, now, counters)
+    if sms:
+        _send_sms(sms, now, counters)
+
+    # Rows of other channels can't be delivered
+    for notification in notifications:
+        if notification.channel not in ('email', 'sms'):
+            _failed(notification, f'کانال {notification.channel} ارسال ندارد', now, retry=False)
+            counters['given_up'] += 1
+
+    Notification.objects.bulk_update(notifications, DELIVERY_FIELDS)
+    counters['elapsed'] = time.monotonic() - started
+    return counters
+
+
+def dispatch_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """Deliver batches until nothing is due; returns the summed counters and the throughput"""
+    started = time.monotonic()
+    totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'given_up': 0, 'batches': 0}
+    while True:
+        counters = dispatch_batch(batch_size)
+        if not counters['claimed']:
+            break
+        totals['batches'] += 1
+        for key in ('claimed', 'sent', 'retried', 'given_up'):
+            totals[key] += counters[key]
+    elapsed = time.monotonic() - started
+    totals['elapsed'] = elapsed
+    totals['rate'] = totals['sent'] / elapsed if elapsed else 0.0
+    return totals
@@ -0,0 +1,74 @@
+# notifications/retention.py
+"""
+Notification retention.
+
+Read in-app notifications and finished email/SMS rows (delivered or given
+up) older than NOTIFICATION_RETENTION_DAYS are removed in primary-key
+batches, optionally after being appended to a JSON Lines archive, so the
+table only holds what users still look at or what is still being delivered.
+In-app score notifications are kept: they record which students were
+already told the result of an exam.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'notif_type', 'channel', 'title', 'message', 'created_at',
+    'sent', 'sent_at', 'extra', 'delivery_attempts', 'last_error',
+]
+
+
+def retention_days():
+    return getattr(settings, 'NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def expired_notifications(days=None, now=None):
+    if days is None:
+        days = retention_days()
+    if now is None:
+        now = timezone.now()
+    finished = Q(sent=True) | Q(channel__in=['email', 'sms'], next_attempt_at__isnull=True)
+    # grading.results.notified_students() reads these to not notify a student twice
+    published = Q(notif_type='score', channel='in_app')
+    return Notification.objects.filter(finished, created_at__lt=now - timedelta(days=days)).exclude(published)
+
+
+def prune_notifications(days=None, batch_size=DEFAULT_BATCH_SIZE, archive=None):
+    """
+    Delete expired notifications batch by batch; when archive is an open text
+    file every row is written to it as one JSON line first.
+    Returns the number of deleted notifications.
+    """
+    expired = expired_notifications(days).order_by('pk')
+    deleted = 0
+    last_pk = 0
+    while True:
+        if archive is not None:
+            rows = list(expired.filter(pk__gt=last_pk).values(*ARCHIVE_FIELDS)[:batch_size])
+            ids = [row['id'] for row in rows]
+        else:
+            ids = list(expired.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        if archive is not None:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            archive.flush()
+
+        with transaction.atomic():
+            count, _ = Notification.objects.filter(pk__in=ids).delete()
+        deleted += count
+    return deleted
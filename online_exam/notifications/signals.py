@@ -0,0 +1,29 @@
+# notifications/signals.py
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .counters import adjust_unread
+from .models import Notification
+
+
+def _is_unread(instance):
+    return instance.__dict__.get('channel') == 'in_app' and instance.__dict__.get('sent') is False
+
+
+@receiver(post_init, sender=Notification)
+def remember_unread(sender, instance, **kwargs):
+    instance._saved_unread = _is_unread(instance) if instance.pk else False
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, **kwargs):
+    unread = _is_unread(instance)
+    if unread != instance._saved_unread:
+        adjust_unread(instance.user_id, 1 if unread else -1)
+    instance._saved_unread = unread
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if instance._saved_unread:
+        adjust_unread(instance.user_id, -1)
@@ -0,0 +1,90 @@
+# notifications/sms.py
+"""
+Pluggable SMS backends, modelled on django.core.mail backends.
+
+SMS_BACKEND names the class to use. The bundled backends only print or
+store the messages; a real provider backend implements send() and, if it
+keeps a session, open() and close().
+"""
+import sys
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_SMS_BACKEND = 'notifications.sms.ConsoleSMSBackend'
+
+
+class BaseSMSBackend:
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, phone_number, text):
+        raise NotImplementedError('subclasses of BaseSMSBackend must override send()')
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """Writes messages to stdout"""
+
+    def __init__(self, *args, stream=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.RLock()
+
+    def send(self, phone_number, text):
+        with self._lock:
+            self.stream.write(f'SMS to {phone_number}:\n{text}\n{"-" * 40}\n')
+            self.stream.flush()
+
+
+class FileSMSBackend(ConsoleSMSBackend):
+    """Appends messages to the file named by SMS_FILE_PATH"""
+
+    def __init__(self, *args, file_path=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_path = file_path or settings.SMS_FILE_PATH
+        self.stream = None
+
+    def open(self):
+        if self.stream is None:
+            self.stream = open(self.file_path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def send(self, phone_number, text):
+        if self.stream is None:
+            with self:
+                super().send(phone_number, text)
+        else:
+            super().send(phone_number, text)
+
+
+class LocmemSMSBackend(BaseSMSBackend):
+    """Keeps messages in notifications.sms.outbox, for tests"""
+
+    def send(self, phone_number, text):
+        outbox.append((phone_number, text))
+
+
+outbox = []
+
+
+def get_sms_backend(backend=None, **kwargs):
+    klass = import_string(backend or getattr(settings, 'SMS_BACKEND', DEFAULT_SMS_BACKEND))
+    return klass(**kwargs)
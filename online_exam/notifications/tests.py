@@ -1,3 +1,261 @@
-from django.test import TestCase
+# notifications/tests.py
+import json
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attempts.models import Attempt
+from online_exam.pagination import paginate_keyset
+from questions.models import Exam
+from . import sms
+from .counters import get_unread_count
+from .models import Notification
+from .retention import prune_notifications
+from .outbox import claim_due, dispatch_pending, retry_delay, send_score_notification
+from .sms import BaseSMSBackend
+
+
+class NotificationTestCase(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student', password='pass', role='student')
+        self.client.login(username='student', password='pass')
+
+    def notify(self, count, **kwargs):
+        return [
+            Notification.objects.create(user=self.student, title=f'n{i}', message='m', **kwargs)
+            for i in range(count)
+        ]
+
+
+class KeysetPaginationTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.notify(7)
+        # Ties on the ordering column are broken by the primary key
+        Notification.objects.update(created_at=timezone.now())
+        self.notifications = Notification.objects.filter(user=self.student)
+
+    def pages(self, per_page=3):
+        page = paginate_keyset(self.notifications, '-created_at', per_page=per_page)
+        pages = [page]
+        while page.has_next:
+            page = paginate_keyset(self.notifications, '-created_at', page.next_cursor, per_page=per_page)
+            pages.append(page)
+        return pages
+
+    def test_walks_forward_without_gaps_or_repeats(self):
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [n.pk for page in pages for n in page]
+        self.assertEqual(ids, sorted(self.notifications.values_list('pk', flat=True), reverse=True))
+        self.assertFalse(pages[0].has_previous)
+
+    def test_walks_backwards(self):
+        pages = self.pages()
+        back = paginate_keyset(self.notifications, '-created_at', pages[2].previous_cursor, per_page=3)
+        self.assertEqual(list(back), list(pages[1]))
+        self.assertTrue(back.has_next and back.has_previous)
+        first = paginate_keyset(self.notifications, '-created_at', back.previous_cursor, per_page=3)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous)
+
+    def test_malformed_cursor_starts_over(self):
+        page = paginate_keyset(self.notifications, '-created_at', 'garbage!!', per_page=3)
+        self.assertEqual(list(page), list(self.pages()[0]))
+
+    def test_feed_follows_cursors(self):
+        response = self.client.get(reverse('notifications:feed'), {'per_page': 5})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['previous'])
+        response = self.client.get(reverse('notifications:feed'), {'cursor': data['next']})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_list_links_the_next_page(self):
+        response = self.client.get(reverse('notifications:list'), {'per_page': 3})
+        self.assertContains(response, 'cursor=')
+
+
+class FailingSMSBackend(BaseSMSBackend):
+    def send(self, phone_number, text):
+        raise RuntimeError('provider down')
+
+
+@override_settings(SMS_BACKEND='notifications.sms.LocmemSMSBackend')
+class OutboxTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        sms.outbox.clear()
+        self.student.email = 'student@example.com'
+        self.student.phone_number = '09120000000'
+        self.student.save()
+        teacher = User.objects.create_user('teacher', role='teacher')
+        exam = Exam.objects.create(title='Exam', teacher=teacher, start_at=timezone.now(), duration_minutes=30)
+        attempt = Attempt.objects.create(student=self.student, exam=exam, status='graded', total_score=3)
+        self.attempt = Attempt.objects.select_related('exam', 'student').get(pk=attempt.pk)
+
+    def test_score_is_queued_not_sent(self):
+        send_score_notification(self.attempt)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('channel', flat=True)), ['email', 'in_app', 'sms']
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(sms.outbox, [])
+
+    def test_dispatch_delivers_a_batch(self):
+        send_score_notification(self.attempt)
+        # Claim, lease, load, bulk update; then the empty claim that ends the loop
+        with self.assertNumQueries(5):
+            totals = dispatch_pending()
+        self.assertEqual((totals['sent'], totals['batches']), (2, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sms.outbox), 1)
+        self.assertEqual(Notification.objects.filter(sent=True).count(), 2)
+        self.assertFalse(Notification.objects.filter(next_attempt_at__isnull=False).exists())
+
+    @override_settings(SMS_BACKEND='notifications.tests.FailingSMSBackend', NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        send_score_notification(self.attempt)
+        totals = dispatch_pending()
+        self.assertEqual((totals['sent'], totals['retried']), (1, 1))
+        failed = Notification.objects.get(channel='sms')
+        self.assertEqual(failed.delivery_attempts, 1)
+        self.assertIn('provider down', failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(dispatch_pending()['claimed'], 0)
+
+        Notification.objects.filter(pk=failed.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch_pending()['given_up'], 1)
+        failed.refresh_from_db()
+        self.assertEqual(failed.delivery_attempts, 2)
+        self.assertIsNone(failed.next_attempt_at)
+        self.assertFalse(failed.sent)
+
+    def test_claimed_rows_are_leased(self):
+        send_score_notification(self.attempt)
+        self.assertEqual(len(claim_due()), 2)
+        self.assertEqual(claim_due(), [])
+
+    def test_retry_delay_doubles_up_to_an_hour(self):
+        self.assertEqual(
+            [retry_delay(n) for n in (1, 2, 3)],
+            [timedelta(seconds=30), timedelta(minutes=1), timedelta(minutes=2)]
+        )
+        self.assertEqual(retry_delay(20), timedelta(hours=1))
+
+
+class UnreadCounterTests(TransactionTestCase):
+    """The counter moves in on_commit callbacks, so these tests really commit"""
+
+    notify = NotificationTestCase.notify
+
+    def setUp(self):
+        cache.clear()
+        NotificationTestCase.setUp(self)
+        self.url = reverse('notifications:unread_count')
+
+    def cached(self):
+        return cache.get(f'notifications:unread:{self.student.pk}')
+
+    def test_counter_follows_in_app_notifications(self):
+        self.assertEqual(get_unread_count(self.student.pk), 0)
+        first, second = self.notify(2)
+        self.notify(1, channel='email')
+        self.assertEqual(self.cached(), 2)
+        first.mark_sent()
+        second.delete()
+        self.assertEqual(self.cached(), 0)
+        self.assertEqual(get_unread_count(self.student.pk), 0)
+
+    def test_rolled_back_notification_leaves_the_counter(self):
+        get_unread_count(self.student.pk)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.notify(1)
+                raise RuntimeError
+        self.assertEqual(self.cached(), 0)
+
+    def test_concurrent_mark_sent_decrements_once(self):
+        notification = self.notify(2)[0]
+        self.assertEqual(get_unread_count(self.student.pk), 2)
+        first = Notification.objects.get(pk=notification.pk)
+        second = Notification.objects.get(pk=notification.pk)
+        self.assertTrue(first.mark_sent())
+        self.assertFalse(second.mark_sent())
+        self.assertEqual(self.cached(), 1)
+
+    def test_unchanged_count_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), {'count': 0})
+        # Session and user only, the count comes from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        etag = response['ETag']
+        self.notify(1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json(), {'count': 1})
+
+    def test_event_stream_sends_the_count(self):
+        self.notify(1)
+        body = b''.join(self.client.get(reverse('notifications:events'))).decode()
+        self.assertIn('event: unread\ndata: {"count": 1}', body)
+
+
+class MarkAllReadTests(NotificationTestCase):
+    def mark_all_read(self, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('notifications:mark_all_read'), data or {})
+
+    def test_marks_the_posted_notifications(self):
+        cache.clear()
+        first, second, third = self.notify(3)
+        self.assertEqual(get_unread_count(self.student.pk), 3)
+        self.mark_all_read({'ids': [first.pk, second.pk, 'x']})
+        self.assertEqual(list(Notification.objects.filter(sent=False)), [third])
+        self.assertEqual(get_unread_count(self.student.pk), 1)
+
+    def test_marks_everything_of_the_user_only(self):
+        other = User.objects.create_user('other', role='student')
+        Notification.objects.create(user=other, title='t', message='m')
+        self.notify(3)
+        self.mark_all_read()
+        self.assertEqual(get_unread_count(self.student.pk), 0)
+        self.assertEqual(Notification.objects.filter(sent=False).get().user, other)
+
+
+class RetentionTests(NotificationTestCase):
+    def age(self, days=100):
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=days))
+
+    def test_prunes_finished_notifications_in_batches(self):
+        read = self.notify(3)
+        Notification.objects.filter(pk__in=[n.pk for n in read]).update(sent=True)
+        Notification.objects.create(user=self.student, title='unread', message='m')
+        Notification.objects.create(user=self.student, title='queued', message='m', channel='email', next_attempt_at=timezone.now())
+        Notification.objects.create(user=self.student, title='given up', message='m', channel='sms')
+        self.age()
+        Notification.objects.create(user=self.student, title='recent', message='m', sent=True)
+
+        archive = StringIO()
+        self.assertEqual(prune_notifications(batch_size=2, archive=archive), 4)
+        lines = [json.loads(line) for line in archive.getvalue().splitlines()]
+        self.assertEqual(sorted(row['title'] for row in lines), ['given up', 'n0', 'n1', 'n2'])
+        self.assertEqual(
+            set(Notification.objects.values_list('title', flat=True)), {'unread', 'queued', 'recent'}
+        )
+
+    def test_score_notifications_are_kept(self):
+        Notification.objects.create(user=self.student, title='score', message='m', notif_type='score', sent=True)
+        self.age()
+        call_command('prune_notifications', days=1, stdout=StringIO())
+        self.assertTrue(Notification.objects.filter(title='score').exists())
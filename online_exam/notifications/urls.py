@@ -7,5 +7,8 @@ app_name = 'notifications'
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='list'),
     path('<int:pk>/read/', views.MarkAsReadView.as_view(), name='mark_read'),
+    path('read-all/', views.MarkAllReadView.as_view(), name='mark_all_read'),
+    path('feed/', views.notification_feed, name='feed'),
     path('unread-count/', views.unread_count, name='unread_count'),
+    path('events/', views.notification_events, name='events'),
 ]
\ No newline at end of file
@@ -1,14 +1,22 @@
 # notifications/views.py
+import asyncio
+import time
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.contrib import messages
 from django.http import JsonResponse
-from django.core.mail import send_mail
-from django.conf import settings
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from online_exam.pagination import paginate_request
 
+from .counters import aget_unread_count, get_unread_count, invalidate_unread
 from .models import Notification
+from .events import can_stream, sse_event, sse_keepalive, sse_response, sse_retry, stream_interval, stream_max_age
 
 
 @method_decorator(login_required, name='dispatch')
@@ -16,8 +24,8 @@ class NotificationListView(View):
     template_name = 'notifications/notification_list.html'
 
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        return render(request, self.template_name, {'notifications': notifications})
+        page = paginate_request(request, Notification.objects.filter(user=request.user), '-created_at')
+        return render(request, self.template_name, {'notifications': page, 'page': page})
 
 
 @method_decorator(login_required, name='dispatch')
@@ -28,61 +36,82 @@ class MarkAsReadView(View):
         return redirect('notifications:list')
 
 
-def send_score_notification(attempt):
-    """Send score notification via email/SMS"""
-    user = attempt.student
-    exam = attempt.exam
-    score = attempt.total_score
-    
-    # Create in-app notification
-    Notification.objects.create(
-        user=user,
-        notif_type='score',
-        channel='in_app',
-        title=f'نمره آزمون {exam.title}',
-        message=f'نمره شما: {score} از {exam.total_score}',
-        extra={'exam_id': exam.id, 'attempt_id': attempt.id, 'score': score}
-    )
-    
-    # Send email if user has email
-    if user.email:
-        try:
-            send_mail(
-                subject=f'نمره آزمون {exam.title}',
-                message=f'سلام {user.get_full_name() or user.username}،\n\n'
-                        f'نمره شما در آزمون {exam.title}: {score} از {exam.total_score}\n\n'
-                        f'با تشکر',
-                from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@example.com',
-                recipient_list=[user.email],
-                fail_silently=True
-            )
-            
-            Notification.objects.create(
-                user=user,
-                notif_type='score',
-                channel='email',
-                title=f'نمره آزمون {exam.title}',
-                message=f'ایمیل ارسال شد به {user.email}',
-                sent=True
-            )
-        except Exception as e:
-            pass
-    
-    # SMS would be sent here if configured
-    if user.phone_number:
-        # Placeholder for SMS sending
-        Notification.objects.create(
-            user=user,
-            notif_type='score',
-            channel='sms',
-            title=f'نمره آزمون {exam.title}',
-            message=f'پیامک به {user.phone_number}',
-            extra={'phone': user.phone_number}
-        )
+@method_decorator(login_required, name='dispatch')
+class MarkAllReadView(View):
+    """Mark the posted notifications (or all of them) as read with one UPDATE"""
+
+    def post(self, request):
+        unread = Notification.objects.filter(user=request.user, channel='in_app', sent=False)
+        ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+        if ids:
+            unread = unread.filter(pk__in=ids)
+        
+        updated = unread.update(sent=True, sent_at=timezone.now())
+        # update() skips the signals that keep the cached counter in step
+        invalidate_unread([request.user.pk])
+        
+        if updated:
+            messages.success(request, f'{updated} اعلان خوانده شد.')
+        return redirect('notifications:list')
 
 
 @login_required
+def notification_feed(request):
+    """AJAX endpoint listing the user's notifications one keyset page at a time"""
+    page = paginate_request(request, Notification.objects.filter(user=request.user), '-created_at')
+    return JsonResponse({
+        'results': [
+            {
+                'id': notification.id,
+                'type': notification.notif_type,
+                'channel': notification.channel,
+                'title': notification.title,
+                'message': notification.message,
+                'created_at': notification.created_at,
+                'read': notification.sent,
+            }
+            for notification in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def unread_count_etag(request):
+    return f'{request.user.pk}-{get_unread_count(request.user.pk)}'
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=unread_count_etag)
 def unread_count(request):
-    """AJAX endpoint for unread notifications count"""
-    count = Notification.objects.filter(user=request.user, sent=False).count()
-    return JsonResponse({'count': count})
\ No newline at end of file
+    """
+    AJAX endpoint for unread notifications count.
+    The count comes from the cache; browsers revalidate with If-None-Match
+    and get an empty 304 while the count is unchanged.
+    """
+    return JsonResponse({'count': get_unread_count(request.user.pk)})
+
+
+@login_required
+async def notification_events(request):
+    """Server-Sent Events stream pushing the unread notifications count"""
+    user = await request.auser()
+    streaming = can_stream(request)
+
+    async def stream():
+        yield sse_retry(streaming)
+        last_count = None
+        closes_at = time.monotonic() + stream_max_age()
+        while True:
+            count = await aget_unread_count(user.pk)
+            if count != last_count:
+                yield sse_event('unread', {'count': count})
+                last_count = count
+            else:
+                yield sse_keepalive()
+            if not streaming or time.monotonic() >= closes_at:
+                return
+            await asyncio.sleep(stream_interval())
+
+    return sse_response(stream())
@@ -0,0 +1,134 @@
+# online_exam/pagination.py
+"""
+Keyset (seek) pagination.
+
+Pages are ordered by a column plus the primary key as tie breaker, and a
+cursor stores the (column, pk) of the row a page starts after. The next page
+is then a ``WHERE (col, pk) < (value, pk)`` range read on an index instead
+of an OFFSET that makes the database count and drop every earlier row, so
+page 500 costs the same as page 1 and rows inserted meanwhile never shift
+what a cursor points to.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+CURSOR_PARAM = 'cursor'
+
+
+def encode_cursor(value, pk, backwards=False):
+    if hasattr(value, 'isoformat'):
+        # Keep full precision, DjangoJSONEncoder rounds times to milliseconds
+        value = value.isoformat()
+    data = {'v': value, 'pk': pk}
+    if backwards:
+        data['b'] = 1
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """Return (value, pk, backwards) or None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return field.to_python(data['v']), int(data['pk']), bool(data.get('b'))
+    except (ValueError, TypeError, KeyError, ValidationError):
+        return None
+
+
+class KeysetPage:
+    """One page of rows with the cursors of its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Return a KeysetPage of the queryset ordered by ``ordering`` (for example
+    '-created_at') and the primary key in the same direction.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    descending = ordering.startswith('-')
+    name = ordering.lstrip('-')
+    field = queryset.model._meta.get_field(name)
+
+    position = decode_cursor(cursor, field)
+    backwards = position is not None and position[2]
+
+    # Walking backwards reads the rows before the cursor in reverse order
+    forward_desc = descending != backwards
+    if forward_desc:
+        queryset = queryset.order_by(f'-{name}', '-pk')
+    else:
+        queryset = queryset.order_by(name, 'pk')
+
+    if position is not None:
+        value, pk = position[:2]
+        lookup = 'lt' if forward_desc else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{name}__{lookup}': value}) | Q(**{name: value, f'pk__{lookup}': pk})
+        )
+
+    rows = list(queryset[:per_page + 1])
+    return keyset_page(rows, per_page, position, lambda row: (getattr(row, name), row.pk))
+
+
+def keyset_page(rows, per_page, position, key):
+    """
+    KeysetPage from up to per_page + 1 rows read after the decoded cursor
+    `position`; key(row) gives the (value, pk) a cursor stores for a row.
+    """
+    backwards = position is not None and position[2]
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(rows)
+
+    next_cursor = previous_cursor = None
+    # Coming from a later page there is always a next one; otherwise only if a row was left over
+    if backwards or has_more:
+        next_cursor = encode_cursor(*key(rows[-1]))
+    if (has_more if backwards else position is not None):
+        previous_cursor = encode_cursor(*key(rows[0]), backwards=True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def paginate_request(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """paginate_keyset() with the cursor (and an optional per_page) taken from the query string"""
+    try:
+        per_page = int(request.GET.get('per_page', per_page))
+    except ValueError:
+        pass
+    return paginate_keyset(queryset, ordering, request.GET.get(CURSOR_PARAM), per_page)
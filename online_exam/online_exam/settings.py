@@ -63,6 +63,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'online_exam.wsgi.application'
+ASGI_APPLICATION = 'online_exam.asgi.application'
 
 
 # Database
@@ -74,6 +75,29 @@ DATABASES = {
 }
 
 
+# Cache
+# Compiled exam papers and other shared read-mostly data live here. Use a
+# shared backend (Redis/Memcached) in production so every worker sees the
+# same invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'online-exam',
+    }
+}
+
+# Seconds a student's "available exams" list is cached
+AVAILABLE_EXAMS_CACHE_TTL = 30
+
+# Seconds before a cached unread notifications counter is recounted from the database
+UNREAD_COUNT_CACHE_TTL = 300
+
+# Server-Sent Events (streamed by the ASGI application; under WSGI the browser polls instead)
+# Seconds between pushes, and seconds before a stream closes and the browser reconnects
+EVENT_STREAM_INTERVAL = 15
+EVENT_STREAM_MAX_AGE = 300
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,6 +133,29 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Answer files, stored once per distinct content (see attempts/storage.py)
+    'answers': {
+        'BACKEND': 'attempts.storage.ContentAddressedStorage',
+    },
+}
+
+# File answers are uploaded in chunks of at most ANSWER_UPLOAD_CHUNK_SIZE bytes
+ANSWER_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+ANSWER_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# How graders' file downloads are sent after the access check: None streams
+# them from Django, 'nginx' uses X-Accel-Redirect to SENDFILE_URL (an internal
+# location aliased to MEDIA_ROOT), 'apache'/'lighttpd' use X-Sendfile
+SENDFILE_BACKEND = None
+SENDFILE_URL = '/protected-media/'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -121,4 +168,18 @@ LOGIN_REDIRECT_URL = 'dashboard:home'
 LOGOUT_REDIRECT_URL = 'accounts:login'
 
 # Email settings (for development)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# SMS backend used by the notification dispatcher (console/file stand-ins for development)
+SMS_BACKEND = 'notifications.sms.ConsoleSMSBackend'
+SMS_FILE_PATH = BASE_DIR / 'sms.log'
+
+# Delivery attempts of an email/SMS notification before the dispatcher gives up
+NOTIFICATION_MAX_ATTEMPTS = 5
+
+# Days read/delivered notifications are kept before prune_notifications deletes them
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Auto grading
+# Hard time budget (seconds) for matching one answer against auto_grade_regex
+AUTO_GRADE_REGEX_TIMEOUT = 0.5
@@ -0,0 +1,83 @@
+# online_exam/versioned_cache.py
+"""
+Versioned cache entries.
+
+Data derived from an object (the paper of an exam, its ranking) is cached
+under the object's current version number, which lives in its own cache
+entry. Invalidating bumps the version, so every process builds and caches a
+fresh value on its next read while the old ones simply expire; nothing has
+to find and delete them.
+
+With local_size set, each process also keeps the last values it loaded, up
+to local_size objects, so a hit only reads the small version entry instead
+of unpickling the value again.
+"""
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+
+def _new_version():
+    # Millisecond timestamp, so a version lost from the cache is never reused
+    return int(time.time() * 1000)
+
+
+class VersionedCache:
+    """Values built per object id, cached as '<prefix>:<id>:<version>'"""
+
+    def __init__(self, prefix, timeout, local_size=0):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.local_size = local_size
+        # id -> (version, value), least recently used first
+        self.loaded = OrderedDict()
+
+    def version_key(self, object_id):
+        return f'{self.prefix}_version:{object_id}'
+
+    def value_key(self, object_id, version):
+        return f'{self.prefix}:{object_id}:{version}'
+
+    def version(self, object_id):
+        key = self.version_key(object_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _new_version(), None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, object_id):
+        """Make the next get() build a new value"""
+        try:
+            cache.incr(self.version_key(object_id))
+        except ValueError:
+            cache.set(self.version_key(object_id), _new_version(), None)
+
+    def get(self, object_id, build):
+        """Return (version, value), calling build(object_id) when no process cached this version yet"""
+        version = self.version(object_id)
+        loaded = self.loaded.get(object_id)
+        if loaded is not None and loaded[0] == version:
+            try:
+                self.loaded.move_to_end(object_id)
+            except KeyError:
+                # Evicted by another thread meanwhile
+                pass
+            return loaded
+
+        key = self.value_key(object_id, version)
+        value = cache.get(key)
+        if value is None:
+            value = build(object_id)
+            cache.set(key, value, self.timeout)
+
+        if self.local_size:
+            self.loaded[object_id] = (version, value)
+            self.loaded.move_to_end(object_id)
+            while len(self.loaded) > self.local_size:
+                self.loaded.popitem(last=False)
+        return version, value
+
+    def clear_local(self):
+        self.loaded.clear()
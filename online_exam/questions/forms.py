@@ -1,6 +1,9 @@
 # questions/forms.py
+import re
+
 from django import forms
 from .models import Exam, Question, Choice
+from grading.regex_sandbox import compile_pattern, times_out
 
 
 class ExamForm(forms.ModelForm):
@@ -84,6 +87,20 @@ class QuestionForm(forms.ModelForm):
             'order': 'ترتیب',
         }
 
+    def clean_auto_grade_regex(self):
+        pattern = (self.cleaned_data.get('auto_grade_regex') or '').strip()
+        if not pattern:
+            return pattern
+        try:
+            compile_pattern(pattern)
+        except re.error as e:
+            raise forms.ValidationError(f'الگوی وارد شده معتبر نیست: {e}')
+        if times_out(pattern):
+            raise forms.ValidationError(
+                'تطبیق این الگو روی ورودی‌های آزمایشی از مهلت مجاز فراتر رفت و ممکن است تصحیح خودکار را متوقف کند.'
+            )
+        return pattern
+
 
 class ChoiceForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['published', 'start_at'], name='questions_e_publish_645dd7_idx'),
+        ),
+    ]
@@ -15,6 +15,10 @@ class Exam(models.Model):
 
     class Meta:
         ordering = ("-start_at",)
+        indexes = [
+            models.Index(fields=["published", "start_at"]),
+            models.Index(fields=["teacher", "-start_at"]),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.topic})"
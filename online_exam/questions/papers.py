@@ -0,0 +1,55 @@
+# questions/papers.py
+"""
+Compiled exam papers.
+
+The question paper of an exam (questions + choices) is the same for every
+student, so it is serialized once and kept in the cache. Every edit to a
+question or choice bumps the exam's paper version, which makes the next
+load compile a fresh copy; old versions simply expire.
+"""
+from django.db import transaction
+
+from .models import Question
+from online_exam.versioned_cache import VersionedCache
+
+PAPER_CACHE_TIMEOUT = 60 * 60 * 24
+
+papers = VersionedCache('exam_paper', PAPER_CACHE_TIMEOUT)
+
+
+def get_paper_version(exam_id):
+    return papers.version(exam_id)
+
+
+def invalidate_exam_paper(exam_id):
+    """Bump the paper version of an exam after one of its questions changed, once the transaction commits"""
+    # After commit, so a concurrent read can't cache the old paper again
+    transaction.on_commit(lambda: papers.bump(exam_id))
+
+
+def compile_exam_paper(exam_id):
+    """Serialize the questions and choices of an exam into plain data"""
+    questions = Question.objects.filter(exam_id=exam_id).prefetch_related('choices')
+    compiled = []
+    for q in questions:
+        choices = None
+        if q.qtype == Question.TYPE_MCQ:
+            choices = tuple({'id': c.id, 'text': c.text} for c in q.choices.all())
+        compiled.append({
+            'id': q.id,
+            'qtype': q.qtype,
+            'text': q.text,
+            'max_score': q.max_score,
+            'order': q.order,
+            'choices': choices,
+        })
+    return tuple(compiled)
+
+
+def get_exam_paper(exam_id):
+    """
+    Return the compiled paper of an exam as ``{'version': ..., 'questions': (...)}``.
+    The result is shared between requests and must be treated as read-only.
+    """
+    version, questions = papers.get(exam_id, compile_exam_paper)
+    return {'version': version, 'questions': questions}
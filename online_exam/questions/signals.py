@@ -0,0 +1,32 @@
+# questions/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Question, Choice
+from .papers import invalidate_exam_paper
+
+# Sent once whenever a question or choice of an exam is saved or deleted,
+# with the keyword argument exam_id
+exam_questions_changed = Signal()
+
+
+def _exam_id(instance):
+    if isinstance(instance, Question):
+        return instance.exam_id
+    if Choice.question.is_cached(instance):
+        return instance.question.exam_id
+    # Choices deleted along with their question find nothing; the question reports itself
+    return Question.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Choice)
+def question_changed(sender, instance, **kwargs):
+    exam_id = _exam_id(instance)
+    if exam_id is not None:
+        exam_questions_changed.send(sender=sender, exam_id=exam_id)
+
+
+@receiver(exam_questions_changed)
+def paper_changed(sender, exam_id, **kwargs):
+    invalidate_exam_paper(exam_id)
@@ -1,3 +1,40 @@
+# questions/tests.py
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from accounts.models import User
+from .models import Exam, Question, Choice
+from .papers import get_exam_paper, papers
+
+
+class ExamPaperTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='pass', role='teacher')
+        self.exam = Exam.objects.create(title='Exam', teacher=teacher, start_at=timezone.now(), duration_minutes=30)
+        self.question = Question.objects.create(exam=self.exam, text='mcq', qtype='mcq', order=1)
+        self.choice = Choice.objects.create(question=self.question, text='old')
+
+    def test_paper_is_compiled_once(self):
+        paper = get_exam_paper(self.exam.pk)
+        self.assertEqual(paper['questions'][0]['choices'], ({'id': self.choice.pk, 'text': 'old'},))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_exam_paper(self.exam.pk), paper)
+
+    def test_choice_edit_bumps_version_after_commit(self):
+        old = get_exam_paper(self.exam.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.choice.text = 'new'
+            self.choice.save()
+            # Not visible before the transaction commits
+            self.assertEqual(papers.version(self.exam.pk), old['version'])
+        paper = get_exam_paper(self.exam.pk)
+        self.assertNotEqual(paper['version'], old['version'])
+        self.assertEqual(paper['questions'][0]['choices'][0]['text'], 'new')
+
+    def test_deleting_question_drops_it_from_paper(self):
+        get_exam_paper(self.exam.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.delete()
+        self.assertEqual(get_exam_paper(self.exam.pk)['questions'], ())
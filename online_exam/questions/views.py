@@ -5,9 +5,11 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from django.contrib import messages
 from django.http import HttpResponseForbidden
+from django.db.models import Count
 
 from .models import Exam, Question, Choice
 from .forms import ExamForm, QuestionForm, ChoiceForm, ChoiceFormSet
+from online_exam.pagination import paginate_request
 
 
 def teacher_required(view_func):
@@ -27,8 +29,9 @@ class ExamListView(View):
     template_name = 'questions/exam_list.html'
 
     def get(self, request):
-        exams = Exam.objects.filter(teacher=request.user)
-        return render(request, self.template_name, {'exams': exams})
+        exams = Exam.objects.filter(teacher=request.user).annotate(question_count=Count('questions'))
+        page = paginate_request(request, exams, '-start_at')
+        return render(request, self.template_name, {'exams': page, 'page': page})
 
 
 @method_decorator([login_required, teacher_required], name='dispatch')